@@ -0,0 +1,107 @@
+# Latency and output drift of the MODEL_CPU_OPTIMIZE inference path against the default one.
+# Usage (from the project root): python -m scripts.benchmark_cpu_inference [--texts N] [--threads N]
+#
+# Embeds and summarizes the same inputs (texts from the user_log, padded
+# with built-in samples) with the default fp32 eager models and with int8 dynamic
+# quantization + inference_mode, and reports median/p95 latency per call and how
+# far the optimized outputs drift from the default ones.
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from web.utils.cpu_inference import configure_threads, inference_context, quantize_linear
+from web.utils.log_store import get_log_store
+
+SAMPLE_TEXTS = [
+    "Traceback (most recent call last): File \"web/routes/agent.py\", line 29, in agent_auto_fix "
+    "summary = summarizer.summarize(error_log) RuntimeError: CUDA is not available on this machine, "
+    "falling back to the CPU implementation failed because the model weights could not be found.",
+    "The deployment to the staging environment finished after the database migration was applied. "
+    "Two workers restarted because of a memory limit and the health check recovered after ninety seconds.",
+    "User asked how to export the memory logs as CSV filtered by intent and date range, then asked "
+    "whether the export could be compressed before it is downloaded from the control panel.",
+    "The nightly reindex job embedded forty thousand log lines, migrated the vector index to HNSW "
+    "and compacted two thousand removed entries before the checkpoint was written to disk.",
+]
+
+def load_texts(count: int) -> list:
+    texts = [
+        entry["text"] for entry in get_log_store("user_log.jsonl").iter_entries()
+        if entry.get("text") and len(entry["text"].split()) >= 20
+    ]
+    texts = list(dict.fromkeys(texts))[:count]
+    while len(texts) < count:
+        texts.append(SAMPLE_TEXTS[len(texts) % len(SAMPLE_TEXTS)] + f" (sample {len(texts)})")
+    return texts
+
+def timed(fn, inputs, optimized: bool):
+    latencies, outputs = [], []
+    with inference_context(optimized):
+        for item in inputs:
+            start = time.perf_counter()
+            outputs.append(fn(item))
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, outputs
+
+def latency_line(label: str, latencies: list) -> str:
+    p95 = float(np.percentile(latencies, 95))
+    return f"  {label:10s} median {statistics.median(latencies):8.1f} ms   p95 {p95:8.1f} ms"
+
+def bench_embedder(texts: list, model_name: str):
+    from sentence_transformers import SentenceTransformer
+    baseline = SentenceTransformer(model_name, device="cpu")
+    optimized = quantize_linear(baseline)
+    encode = lambda model: (lambda text: model.encode(text, convert_to_numpy=True, normalize_embeddings=True))
+    for model in (baseline, optimized):  # warm up
+        encode(model)(texts[0])
+    base_ms, base_vecs = timed(encode(baseline), texts, optimized=False)
+    opt_ms, opt_vecs = timed(encode(optimized), texts, optimized=True)
+    cosines = np.sum(np.array(base_vecs) * np.array(opt_vecs), axis=1)
+    print(f"🔢 Embedder ({model_name}), {len(texts)} single-text calls")
+    print(latency_line("fp32", base_ms))
+    print(latency_line("int8", opt_ms))
+    print(f"  drift      cosine(fp32, int8) mean {cosines.mean():.4f}   min {cosines.min():.4f}\n")
+
+def bench_summarizer(texts: list):
+    from web.memory.summarizer_engine import Summarizer
+    baseline = Summarizer(optimize=False)
+    optimized = Summarizer(optimize=True)
+    # Call the pipelines directly so the summary cache and short-input check stay out of the numbers.
+    summarize = lambda summarizer: (
+        lambda text: summarizer.summarizer(text, max_length=130, min_length=30, do_sample=False, truncation=True)[0]["summary_text"]
+    )
+    for summarizer in (baseline, optimized):  # warm up
+        summarize(summarizer)(texts[0])
+    base_ms, base_out = timed(summarize(baseline), texts, optimized=False)
+    opt_ms, opt_out = timed(summarize(optimized), texts, optimized=True)
+    exact = sum(a == b for a, b in zip(base_out, opt_out)) / len(texts)
+    overlap = [
+        len(set(a.lower().split()) & set(b.lower().split())) / max(1, len(set(a.lower().split()) | set(b.lower().split())))
+        for a, b in zip(base_out, opt_out)
+    ]
+    print(f"📝 Summarizer (distilbart-cnn-12-6), {len(texts)} calls")
+    print(latency_line("fp32", base_ms))
+    print(latency_line("int8", opt_ms))
+    print(f"  drift      identical summaries {exact:.0%}   mean word overlap {statistics.mean(overlap):.2f}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default and MODEL_CPU_OPTIMIZE inference on CPU.")
+    parser.add_argument("--texts", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads for both runs (0 = default)")
+    parser.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--skip-summarizer", action="store_true")
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    import torch
+    print(f"⚙️  torch {torch.__version__}, {torch.get_num_threads()} threads\n")
+    texts = load_texts(args.texts)
+    bench_embedder(texts, args.embedding_model)
+    if not args.skip_summarizer:
+        bench_summarizer(texts)
+
+if __name__ == "__main__":
+    main()
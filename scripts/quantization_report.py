@@ -0,0 +1,91 @@
+# Recall-vs-size report for the scalar-quantized vector storage modes.
+# Usage (from the project root): python -m scripts.quantization_report [--synthetic] [--count N]
+#
+# Embeds the texts in the user_log with MiniLM (or, with --synthetic or
+# when there are too few logs, clustered random unit vectors) and compares every
+# VECTOR_QUANTIZATION / EMBED_STORE_DTYPE mode against exact float32 search.
+
+import argparse
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from web.memory import ann_backends
+from web.memory.embedding_store import STORE_DTYPES, quantize, dequantize
+from web.utils.log_store import get_log_store
+
+MIN_LOG_TEXTS = 1000
+
+def load_log_embeddings(count: int) -> Optional[np.ndarray]:
+    texts = [entry["text"] for entry in get_log_store("user_log.jsonl").iter_entries() if entry.get("text")]
+    texts = list(dict.fromkeys(texts))[:count]
+    if len(texts) < MIN_LOG_TEXTS:
+        return None
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+    return model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+
+def synthetic_embeddings(count: int, dim: int = 384, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.8 * rng.normal(size=(count, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+def index_report(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    dim = vectors.shape[1]
+    ids = np.arange(len(vectors), dtype=np.int64)
+    for backend in ("flat", "hnsw", "ivf_flat"):
+        for quantization in ann_backends.QUANTIZATIONS:
+            base = ann_backends.build_index(backend, dim, len(vectors), quantization)
+            if not base.is_trained:
+                base.train(vectors)
+            index = faiss.IndexIDMap(base)
+            index.add_with_ids(vectors, ids)
+            params = ann_backends.search_params(index)
+            _, found = index.search(queries, top_k, params=params)
+            size = faiss.serialize_index(index).nbytes / len(vectors)
+            print(f"  index  {backend:9s} {quantization:5s} {size:9.1f} B/vector   recall@{top_k} {recall(found, truth):.4f}")
+
+def store_report(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    # The old store kept Python lists: a 56-byte list header, 8 bytes per pointer
+    # and a 24-byte float object per element.
+    list_bytes = 56 + 32 * vectors.shape[1]
+    print(f"  store  list    {'':5s} {list_bytes:9.1f} B/vector   recall@{top_k} 1.0000")
+    for dtype in STORE_DTYPES:
+        stored = [quantize(vector.tolist(), dtype) for vector in vectors]
+        restored = np.array([dequantize(codes, scale) for codes, scale in stored], dtype=np.float32)
+        found = np.argsort(-(queries @ restored.T), axis=1)[:, :top_k]
+        size = np.mean([codes.nbytes for codes, _ in stored])
+        print(f"  store  {dtype:7s} {'':5s} {size:9.1f} B/vector   recall@{top_k} {recall(found, truth):.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs. bytes per vector for each quantization mode.")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--synthetic", action="store_true")
+    args = parser.parse_args()
+
+    vectors = None if args.synthetic else load_log_embeddings(args.count + args.queries)
+    source = "user_log.jsonl"
+    if vectors is None:
+        vectors = synthetic_embeddings(args.count + args.queries)
+        source = "synthetic clustered vectors"
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries, vectors = vectors[:args.queries], vectors[args.queries:]
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.top_k)
+
+    print(f"📏 {len(vectors)} vectors x {vectors.shape[1]} dims from {source}, {len(queries)} queries\n")
+    index_report(vectors, queries, truth, args.top_k)
+    store_report(vectors, queries, truth, args.top_k)
+
+if __name__ == "__main__":
+    main()
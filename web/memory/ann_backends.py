@@ -0,0 +1,177 @@
+import faiss
+import math
+import os
+import numpy as np
+from typing import Optional
+
+BACKENDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Scalar quantization of the stored vectors: "fp16" halves and "int8" quarters
+# the bytes per vector. IVF-PQ is already compressed and ignores this setting.
+QUANTIZATIONS = ("none", "fp16", "int8")
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+PQ_BITS = 8
+DEFAULT_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))
+DEFAULT_EF_SEARCH = int(os.getenv("VECTOR_EF_SEARCH", "64"))
+# Upper bound for efSearch once it is widened for a selective filter.
+MAX_EF_SEARCH = int(os.getenv("VECTOR_MAX_EF_SEARCH", "1024"))
+
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,  # per-dimension ranges learned in train()
+}
+
+def build_index(backend: str, dim: int, n_vectors: int, quantization: str = "none") -> faiss.Index:
+    """Create an untrained inner-product index of the given backend, sized for n_vectors."""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown vector quantization '{quantization}'. Expected one of {QUANTIZATIONS}.")
+    qtype = _SQ_TYPES.get(quantization)
+    if backend == "flat":
+        if qtype is None:
+            return faiss.IndexFlatIP(dim)
+        return faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+    if backend == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dim, qtype, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    # IVF wants ~39 training points per list; keep nlist within what we can train on.
+    nlist = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+    quantizer = faiss.IndexFlatIP(dim)
+    if backend == "ivf_flat":
+        if qtype is None:
+            return faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+    if backend == "ivf_pq":
+        return faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), PQ_BITS, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown vector backend '{backend}'. Expected one of {BACKENDS}.")
+
+def backend_of(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+def quantization_of(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return next(name for name, qtype in _SQ_TYPES.items() if qtype == index.sq.qtype)
+    return "none"
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  selector: Optional[faiss.IDSelector] = None, selectivity: float = 1.0) -> Optional[faiss.SearchParameters]:
+    """
+    Per-query search parameters for whatever backend `index` currently is.
+    `selectivity` is the fraction of vectors `selector` lets through: IVF and
+    HNSW drop filtered-out hits during the search, so nprobe and efSearch are
+    scaled up by 1 / selectivity to still find enough matching ones.
+    """
+    backend = backend_of(index)
+    widen = 1.0 / max(selectivity, 1e-6)
+    if backend in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF()
+        nlist = faiss.downcast_index(index.index if isinstance(index, faiss.IndexIDMap) else index).nlist
+        params.nprobe = min(nlist, math.ceil((int(nprobe) if nprobe else DEFAULT_NPROBE) * widen))
+    elif backend == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        ef = math.ceil((int(ef_search) if ef_search else DEFAULT_EF_SEARCH) * widen)
+        params.efSearch = max(1, min(ef, MAX_EF_SEARCH, index.ntotal))
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if selector is not None:
+        params.sel = selector
+    return params
+
+def migrate(index: faiss.IndexIDMap, backend: str, dim: int, quantization: str = "none") -> faiss.IndexIDMap:
+    """Rebuild `index` as `backend` with `quantization`, keeping the same numeric IDs."""
+    n_vectors = index.ntotal
+    vectors = _reconstruct_all(faiss.downcast_index(index.index))
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    base = build_index(backend, dim, n_vectors, quantization)
+    if not base.is_trained:
+        base.train(vectors)
+    migrated = faiss.IndexIDMap(base)
+    migrated.add_with_ids(vectors, ids)
+    return migrated
+
+def copy_tail(source: faiss.IndexIDMap, target: faiss.IndexIDMap, start: int,
+              new_ids: Optional[np.ndarray] = None):
+    """
+    Add the vectors `source` holds from position `start` on to `target`, under
+    the same IDs or, with `new_ids`, renumbered to new_ids[id].
+    """
+    if source.ntotal <= start:
+        return
+    positions = np.arange(start, source.ntotal, dtype=np.int64)
+    vectors = reconstruct(faiss.downcast_index(source.index), positions)
+    ids = faiss.vector_to_array(source.id_map).astype(np.int64)[start:]
+    if new_ids is not None:
+        ids = new_ids[ids]
+    target.add_with_ids(vectors, ids)
+
+def compact(index: faiss.IndexIDMap, dim: int, new_ids: np.ndarray) -> faiss.IndexIDMap:
+    """
+    Return a copy of `index` without the vectors whose numeric ID maps to -1 in
+    `new_ids`, with the remaining vectors renumbered to new_ids[old_id]. IVF
+    indexes keep their trained quantizer; flat and HNSW start from a fresh index
+    (scalar quantizers are retrained on the surviving vectors).
+    """
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    live = new_ids[ids] >= 0
+    base = faiss.downcast_index(index.index)
+    vectors = _reconstruct_all(base)[live]
+    if isinstance(base, faiss.IndexIVF):
+        empty = faiss.clone_index(base)
+        empty.reset()
+    else:
+        empty = build_index(backend_of(index), dim, len(vectors), quantization_of(index))
+        if not empty.is_trained:
+            if len(vectors):
+                empty.train(vectors)
+            else:
+                # Nothing left to train on; the next migration quantizes it again.
+                empty = build_index(backend_of(index), dim, 0)
+    compacted = faiss.IndexIDMap(empty)
+    compacted.add_with_ids(vectors, new_ids[ids[live]])
+    return compacted
+
+def reconstruct(base: faiss.Index, positions: np.ndarray) -> np.ndarray:
+    """The stored (decoded) vectors at `positions` of an unwrapped index."""
+    if isinstance(base, faiss.IndexIVF) and base.direct_map.no():
+        # Kept from here on; add() maintains it at 8 bytes per vector.
+        base.make_direct_map()
+    vectors = np.empty((len(positions), base.d), dtype=np.float32)
+    for row, position in enumerate(positions):
+        vectors[row] = base.reconstruct(int(position))
+    return vectors
+
+def _reconstruct_all(base: faiss.Index) -> np.ndarray:
+    if not isinstance(base, faiss.IndexIVF):
+        return base.reconstruct_n(0, base.ntotal)
+    # IVF lists are not addressable by position without a direct map.
+    if not base.direct_map.no():
+        return base.reconstruct_n(0, base.ntotal)
+    base.make_direct_map()
+    vectors = base.reconstruct_n(0, base.ntotal)
+    base.set_direct_map_type(faiss.DirectMap.NoMap)
+    return vectors
+
+def _pq_subquantizers(dim: int) -> int:
+    # Largest sub-quantizer count <= dim / 8 that divides dim (48 for MiniLM's 384 dims).
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
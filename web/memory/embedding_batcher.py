@@ -0,0 +1,98 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List
+
+# Requests arriving within BATCH_WINDOW_MS of the first queued one share a forward
+# pass of up to MAX_BATCH texts. A window of 0 encodes every call directly.
+BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent encode calls into one model call on a worker thread;
+    each caller waits on a Future for its slice of the result.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH):
+        self.encode_fn = encode_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1024)  # submit -> result, in seconds
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Anything that fills a batch on its own gains nothing from waiting.
+        if self.window_ms <= 0 or len(texts) >= self.max_batch:
+            return self.encode_fn(texts)
+        return self.submit(texts).result()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batches, requests, texts = self.batches, self.requests, self.texts
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "queued": self._queue.qsize(),
+            "batches": batches,
+            "requests": requests,
+            "texts": texts,
+            "mean_batch_size": round(texts / batches, 2) if batches else 0,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        }
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            count = len(pending[0][0])
+            deadline = time.perf_counter() + self.window_ms / 1000
+            while count < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                count += len(pending[-1][0])
+            self._flush(pending)
+
+    def _flush(self, pending: list):
+        texts = [text for request_texts, _, _ in pending for text in request_texts]
+        try:
+            vectors = self.encode_fn(texts)
+        except Exception as e:
+            for _, future, _ in pending:
+                future.set_exception(e)
+            return
+        done = time.perf_counter()
+        offset = 0
+        for request_texts, future, queued in pending:
+            future.set_result(vectors[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+        with self._lock:
+            self.batches += 1
+            self.requests += len(pending)
+            self.texts += len(texts)
+            self._latencies.extend(done - queued for _, _, queued in pending)
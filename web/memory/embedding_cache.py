@@ -0,0 +1,155 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from web.utils.cpu_inference import CPU_OPTIMIZE
+
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "web/memory/embedding_cache")
+MEMORY_ENTRIES = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+PERSIST = os.getenv("EMBED_CACHE_PERSIST", "true").lower() == "true"
+# Once the cache file holds more records than this it is rewritten with the newest half.
+DISK_ENTRIES = int(os.getenv("EMBED_CACHE_DISK_ENTRIES", "200000"))
+
+KEY_BYTES = 16
+
+def normalize_text(text: str) -> str:
+    # Tokenizers split on whitespace, so collapsing it cannot change the embedding.
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(model_name: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{model_name}\0{normalize_text(text)}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by hash(model name, normalized text). The int8 model that
+    MODEL_CPU_OPTIMIZE loads produces slightly different vectors, so it gets its
+    own keys and file rather than sharing the fp32 model's.
+
+    Lookups go to a bounded in-memory LRU first, then to an append-only file of
+    fixed-size (key, float32 vector) records that is memory-mapped, so cached
+    vectors survive restarts and are shared between worker processes. The file
+    is compacted to its newest disk_entries / 2 records when it outgrows
+    disk_entries; other processes notice the new file and remap it.
+    """
+
+    def __init__(self, model_name: str, dim: int, memory_entries: int = MEMORY_ENTRIES,
+                 persist: bool = PERSIST, cache_dir: str = CACHE_DIR, quantized: bool = CPU_OPTIMIZE,
+                 disk_entries: int = DISK_ENTRIES):
+        self.model_name = model_name
+        self.quantized = quantized
+        # Unchanged for the fp32 model, so caches written before int8 existed stay valid.
+        self.variant = f"{model_name}-int8" if quantized else model_name
+        self.dim = dim
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.path = None
+        if persist:
+            os.makedirs(cache_dir, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9_.-]", "_", self.variant)
+            self.path = os.path.join(cache_dir, f"{slug}-{dim}.bin")
+        self._record = np.dtype([("key", f"V{KEY_BYTES}"), ("vector", "<f4", (dim,))])
+        self._rows: Dict[bytes, int] = {}
+        self._mapped = None
+        self._mapped_rows = 0
+        self._inode = None
+        self._refresh()
+
+    def key(self, text: str) -> bytes:
+        return cache_key(self.variant, text)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            found = [self._get(key) for key in keys]
+            if self.path and any(vector is None for vector in found) and self._refresh():
+                # Another process may have appended the missing ones.
+                found = [vector if vector is not None else self._get(key) for key, vector in zip(keys, found)]
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(found) - hits
+            return found
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            new = []
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+                if self.path and key not in self._rows:
+                    new.append((key, vector))
+            if new:
+                records = np.zeros(len(new), dtype=self._record)
+                records["key"] = [np.void(key) for key, _ in new]
+                records["vector"] = [vector for _, vector in new]
+                # O_APPEND keeps concurrent writers from interleaving records.
+                with open(self.path, "ab") as f:
+                    f.write(records.tobytes())
+                if os.path.getsize(self.path) // self._record.itemsize > self.disk_entries:
+                    self._compact()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "quantized": self.quantized,
+            "memory_entries": len(self._lru),
+            "disk_entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            return vector
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        vector = np.array(self._mapped[row]["vector"])
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def _compact(self):
+        self._refresh()
+        keep = self.disk_entries // 2
+        records = self._mapped[len(self._mapped) - keep:] if keep else self._mapped[:0]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(records.tobytes())
+        os.replace(tmp, self.path)
+        self._refresh()
+
+    def _refresh(self) -> bool:
+        """Map any records appended to the cache file since the last call. Returns True if there were some."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode:
+            # First call, or the file was compacted (by any process): map it from the start.
+            self._inode = stat.st_ino
+            self._rows = {}
+            self._mapped = None
+            self._mapped_rows = 0
+        # A torn final record from a crashed writer is ignored until it is completed.
+        rows = stat.st_size // self._record.itemsize
+        if rows <= self._mapped_rows:
+            return False
+        self._mapped = np.memmap(self.path, dtype=self._record, mode="r", shape=(rows,))
+        for row, key in enumerate(self._mapped["key"][self._mapped_rows:rows].tolist(), start=self._mapped_rows):
+            self._rows.setdefault(key, row)
+        self._mapped_rows = rows
+        return True
@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+from typing import Dict, List
+
+from web.memory.embedding_batcher import EmbeddingBatcher
+from web.memory.embedding_cache import EmbeddingCache
+from web.utils.cpu_inference import inference_context
+from web.utils.lazy_loader import registry, register_embedding_model, EMBEDDING_MODEL as DEFAULT_MODEL
+ENCODE_BATCH_SIZE = 64
+
+_services: Dict[str, "EmbeddingService"] = {}
+_services_lock = threading.Lock()
+
+class EmbeddingService:
+    """
+    One SentenceTransformer per process, loaded through the model registry. Encoding is
+    serialized: the fast tokenizers are not safe to share between threads, and
+    the forward pass already spreads over torch's intra-op threads. Texts that
+    were embedded before are served from an EmbeddingCache, and small concurrent
+    requests share forward passes through an EmbeddingBatcher.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self.registry_name = register_embedding_model(model_name)
+        self._dim = None
+        self._cache = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self.batcher = EmbeddingBatcher(self._encode_now)
+
+    @property
+    def model(self):
+        # Not cached here, so the registry can unload an idle model.
+        return registry.get(self.registry_name)
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = self.model.get_sentence_embedding_dimension()
+        return self._dim
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        if self._cache is None:
+            dim = self.dim
+            with self._load_lock:
+                if self._cache is None:
+                    self._cache = EmbeddingCache(self.model_name, dim)
+        return self._cache
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.encode_batch([text])[0]
+
+    def encode_batch(self, texts: List[str], batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = {}  # key -> text, so repeats within the batch are encoded once
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            encoded = self._encode(list(missing.values()), batch_size)
+            self.cache.put_many(list(missing), encoded)
+            computed = dict(zip(missing, encoded))
+            vectors = [vector if vector is not None else computed[key] for key, vector in zip(keys, vectors)]
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, "loaded": registry.stats()[self.registry_name]["loaded"],
+                "cache": self._cache.stats() if self._cache is not None else None,
+                "batching": self.batcher.stats()}
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        if len(texts) >= self.batcher.max_batch:
+            return self._encode_now(texts, batch_size)
+        return self.batcher.encode(texts)
+
+    def _encode_now(self, texts: List[str], batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+        model = self.model
+        with self._encode_lock, inference_context():
+            return model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+def get_embedding_service(model_name: str = DEFAULT_MODEL) -> EmbeddingService:
+    """The process-wide EmbeddingService for `model_name`; use this instead of loading SentenceTransformer directly."""
+    with _services_lock:
+        service = _services.get(model_name)
+        if service is None:
+            service = EmbeddingService(model_name)
+            _services[model_name] = service
+        return service
+
+def embedding_stats() -> dict:
+    """Model, cache and batching stats for every embedding service created in this process."""
+    with _services_lock:
+        services = list(_services.values())
+    return {service.model_name: service.stats() for service in services}
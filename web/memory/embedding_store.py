@@ -5,18 +5,40 @@ from datetime import datetime
 import os
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 MAX_EMBEDDINGS = 1000
 use_store = os.getenv("USE_EMBED_STORE", "true").lower() == "true"
+# Storage precision: "float32", "float16" or "int8" (symmetric, one scale per vector).
+# Vectors are dequantized to lists of floats on the way out.
+STORE_DTYPES = ("float32", "float16", "int8")
+store_dtype = os.getenv("EMBED_STORE_DTYPE", "float32").lower()
+if store_dtype not in STORE_DTYPES:
+    raise ValueError(f"Unknown EMBED_STORE_DTYPE '{store_dtype}'. Expected one of {STORE_DTYPES}.")
 
-embedding_db: Dict[str, Tuple[List[float], str]] = {}
+# identifier -> (stored codes, dequantization scale, timestamp)
+embedding_db: Dict[str, Tuple[np.ndarray, float, str]] = {}
 
 def set_use_store(value: bool) -> None:
     global use_store
     use_store = value
     logger.info(f"[EMBEDDING TOGGLE] Embedding store enabled: {use_store}")
 
+def quantize(vector: List[float], dtype: str = None) -> Tuple[np.ndarray, float]:
+    dtype = dtype or store_dtype
+    values = np.asarray(vector, dtype=np.float32)
+    if dtype != "int8":
+        return values.astype(dtype), 1.0
+    scale = float(np.abs(values).max()) / 127 if len(values) else 0.0
+    if scale == 0.0:
+        return np.zeros(len(values), dtype=np.int8), 1.0
+    return np.round(values / scale).astype(np.int8), scale
+
+def dequantize(codes: np.ndarray, scale: float) -> List[float]:
+    return (codes.astype(np.float32) * scale).tolist()
+
 def add_embedding(identifier: str, vector: List[float]) -> None:
     if not use_store:
         return
@@ -30,20 +52,21 @@ def add_embedding(identifier: str, vector: List[float]) -> None:
         del embedding_db[oldest_id]
 
     timestamp = datetime.utcnow().isoformat()
-    embedding_db[identifier] = (vector, timestamp)
+    codes, scale = quantize(vector)
+    embedding_db[identifier] = (codes, scale, timestamp)
 
 def get_embedding(identifier: str) -> Optional[List[float]]:
     if not use_store:
         return None
 
     entry = embedding_db.get(identifier)
-    return entry[0] if entry else None
+    return dequantize(entry[0], entry[1]) if entry else None
 
 def get_all_embeddings() -> List[Tuple[str, List[float]]]:
     if not use_store:
         return []
 
-    return [(k, v[0]) for k, v in embedding_db.items()]
+    return [(k, dequantize(v[0], v[1])) for k, v in embedding_db.items()]
 
 def clear_embeddings() -> None:
     if not use_store:
@@ -51,9 +74,11 @@ def clear_embeddings() -> None:
 
     embedding_db.clear()
 
-def get_store_summary() -> Dict[str, int]:
+def get_store_summary() -> Dict[str, object]:
     return {
         "enabled": int(use_store),
         "count": len(embedding_db),
-        "max": MAX_EMBEDDINGS
-    }
\ No newline at end of file
+        "max": MAX_EMBEDDINGS,
+        "dtype": store_dtype,
+        "vector_bytes": sum(codes.nbytes for codes, _, _ in embedding_db.values())
+    }
@@ -0,0 +1,121 @@
+import numpy as np
+import os
+import pickle
+import struct
+import zlib
+from typing import Collection, Dict, Iterator, List, Optional
+
+# Layout: header | offsets int64[count + 1] | hash slots int64[slots] | utf-8 string blob
+_MAGIC = b"FIDT"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIQQQ")  # magic, version, count, slots, blob length
+
+class IDTable:
+    """
+    Numeric ID -> string ID table backed by a memory-mapped file.
+
+    The checkpointed part is an offsets array into a string blob plus an
+    open-addressing hash table for reverse lookups, so loading is a single
+    mmap and the pages are shared read-only between worker processes. IDs
+    appended since the last checkpoint live in a small in-memory tail.
+    """
+
+    def __init__(self):
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._slots = np.full(1, -1, dtype=np.int64)
+        self._blob = b""
+        self._base_count = 0
+        self._tail: List[str] = []
+        self._tail_lookup: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "IDTable":
+        table = cls()
+        if os.path.getsize(path) == 0:
+            return table
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, count, slots, blob_len = _HEADER.unpack(bytes(mm[:_HEADER.size]))
+        if magic != _MAGIC or version != _VERSION:
+            raise RuntimeError(f"{path} is not a version {_VERSION} ID table.")
+        start = _HEADER.size
+        table._offsets = mm[start:start + (count + 1) * 8].view(np.int64)
+        start += (count + 1) * 8
+        table._slots = mm[start:start + slots * 8].view(np.int64)
+        start += slots * 8
+        table._blob = mm[start:start + blob_len]
+        table._base_count = int(count)
+        return table
+
+    @classmethod
+    def from_legacy_pickle(cls, path: str) -> "IDTable":
+        with open(path, "rb") as f:
+            id_map, _, _ = pickle.load(f)
+        table = cls()
+        for id_str in id_map:
+            table.append(id_str)
+        return table
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._tail)
+
+    def __getitem__(self, numeric_id: int) -> str:
+        numeric_id = int(numeric_id)
+        if numeric_id < 0 or numeric_id >= len(self):
+            raise IndexError(numeric_id)
+        if numeric_id >= self._base_count:
+            return self._tail[numeric_id - self._base_count]
+        start, end = self._offsets[numeric_id], self._offsets[numeric_id + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for numeric_id in range(len(self)):
+            yield self[numeric_id]
+
+    def __contains__(self, id_str: str) -> bool:
+        return self.get(id_str) is not None
+
+    def get(self, id_str: str) -> Optional[int]:
+        numeric_id = self._tail_lookup.get(id_str)
+        if numeric_id is not None or not self._base_count:
+            return numeric_id
+        key = id_str.encode("utf-8")
+        mask = len(self._slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            candidate = int(self._slots[slot])
+            if candidate == -1:
+                return None
+            start, end = self._offsets[candidate], self._offsets[candidate + 1]
+            if end - start == len(key) and bytes(self._blob[start:end]) == key:
+                return candidate
+            slot = (slot + 1) & mask
+
+    def append(self, id_str: str) -> int:
+        numeric_id = len(self)
+        self._tail.append(id_str)
+        self._tail_lookup[id_str] = numeric_id
+        return numeric_id
+
+    def write(self, path: str, exclude: Collection[int] = ()):
+        """Write the whole table to `path`; IDs in `exclude` keep their slot but are not hashed."""
+        encoded = [id_str.encode("utf-8") for id_str in self]
+        count = len(encoded)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        if count:
+            np.cumsum([len(key) for key in encoded], out=offsets[1:])
+        # Power-of-two slot count at <= 50% load keeps linear probe chains short.
+        slots = np.full(1 << max(3, (2 * count).bit_length()), -1, dtype=np.int64)
+        mask = len(slots) - 1
+        for numeric_id, key in enumerate(encoded):
+            if numeric_id in exclude:
+                continue
+            slot = zlib.crc32(key) & mask
+            while slots[slot] != -1:
+                slot = (slot + 1) & mask
+            slots[slot] = numeric_id
+        blob = b"".join(encoded)
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, count, len(slots), len(blob)))
+            f.write(offsets.tobytes())
+            f.write(slots.tobytes())
+            f.write(blob)
@@ -0,0 +1,162 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import numpy as np
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# The summarizer pipeline is not safe to call from several threads at once, so one
+# worker is the default; raise it only with thread-safe handlers.
+INGEST_WORKERS = int(os.getenv("MEMORY_INGEST_WORKERS", "1"))
+INGEST_QUEUE_SIZE = int(os.getenv("MEMORY_INGEST_QUEUE_SIZE", "1000"))
+# How long submit() waits for room in a full queue before running the job in the caller.
+INGEST_ENQUEUE_TIMEOUT = float(os.getenv("MEMORY_INGEST_ENQUEUE_TIMEOUT", "0.5"))
+INGEST_SHUTDOWN_TIMEOUT = float(os.getenv("MEMORY_INGEST_SHUTDOWN_TIMEOUT", "30"))
+# Most queued items a worker hands to one batch job call (see submit_batched).
+INGEST_BATCH_SIZE = int(os.getenv("MEMORY_INGEST_BATCH_SIZE", "16"))
+
+_shared = None
+_shared_lock = threading.Lock()
+
+class IngestQueue:
+    """
+    Bounded job queue drained by background worker threads.
+
+    submit() returns as soon as the job is queued. When the queue is full the
+    caller waits up to `enqueue_timeout` and then runs the job itself, so a
+    burst slows requests down instead of dropping memories. flush() is a
+    barrier for everything submitted before it.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, maxsize: int = INGEST_QUEUE_SIZE,
+                 enqueue_timeout: float = INGEST_ENQUEUE_TIMEOUT, batch_size: int = INGEST_BATCH_SIZE):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.enqueue_timeout = enqueue_timeout
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._inflight = set()  # sequence numbers submitted but not finished
+        self._waits = deque(maxlen=1024)  # seconds spent queued
+        self._durations = deque(maxlen=1024)  # seconds spent running
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.ran_inline = 0
+        self.max_depth = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"memory-ingest-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job: Callable, *args) -> int:
+        """Queue job(*args); returns its sequence number."""
+        return self._submit(job, args, batched=False)
+
+    def submit_batched(self, job: Callable, item) -> int:
+        """
+        Queue `item` for job(items). A worker passes consecutive queued items of
+        the same job to one call, up to batch_size, so the job can process them
+        together. Returns the item's sequence number.
+        """
+        return self._submit(job, item, batched=True)
+
+    def _submit(self, job: Callable, payload, batched: bool) -> int:
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._inflight.add(seq)
+            self.submitted += 1
+        try:
+            self._queue.put((seq, job, payload, batched, time.perf_counter()), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._cond:
+                self.ran_inline += 1
+            logger.warning("[IngestQueue] Queue full; running job in the calling thread.")
+            self._execute([seq], job, ([payload],) if batched else payload, [time.perf_counter()])
+            return seq
+        with self._cond:
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return seq
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every job submitted before this call has finished. Returns False on timeout."""
+        with self._cond:
+            target = self._seq
+            return self._cond.wait_for(
+                lambda: not self._inflight or min(self._inflight) > target, timeout=timeout
+            )
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = np.array(self._waits) * 1000
+            durations = np.array(self._durations) * 1000
+            return {
+                "workers": self.workers,
+                "capacity": self.maxsize,
+                "queued": self._queue.qsize(),
+                "in_flight": len(self._inflight),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "failed": self.failed,
+                "ran_inline": self.ran_inline,
+                "wait_p99_ms": round(float(np.percentile(waits, 99)), 2) if len(waits) else None,
+                "run_p50_ms": round(float(np.percentile(durations, 50)), 2) if len(durations) else None,
+                "run_p99_ms": round(float(np.percentile(durations, 99)), 2) if len(durations) else None,
+            }
+
+    def _run(self):
+        held = None  # an item taken while draining a batch that belongs to the next one
+        while True:
+            seq, job, payload, batched, queued = held or self._queue.get()
+            held = None
+            if not batched:
+                self._execute([seq], job, payload, [queued])
+                continue
+            seqs, items, queued_at = [seq], [payload], [queued]
+            while len(items) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if not item[3] or item[1] != job:
+                    held = item
+                    break
+                seqs.append(item[0])
+                items.append(item[2])
+                queued_at.append(item[4])
+            self._execute(seqs, job, (items,), queued_at)
+
+    def _execute(self, seqs: list, job: Callable, args: tuple, queued: list):
+        start = time.perf_counter()
+        failed = False
+        try:
+            job(*args)
+        except Exception:
+            failed = True
+            logger.exception("[IngestQueue] Ingestion job failed.")
+        with self._cond:
+            self._inflight.difference_update(seqs)
+            self.processed += len(seqs)
+            self.failed += failed * len(seqs)
+            self._waits.extend(start - queued_at for queued_at in queued)
+            # Each item of a batch is charged its share of the run.
+            self._durations.extend([(time.perf_counter() - start) / len(seqs)] * len(seqs))
+            self._cond.notify_all()
+
+def get_ingest_queue() -> IngestQueue:
+    """The process-wide IngestQueue, started on first use and drained at interpreter exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = IngestQueue()
+            atexit.register(_shared.flush, INGEST_SHUTDOWN_TIMEOUT)
+        return _shared
@@ -1,26 +1,14 @@
-import json
-from pathlib import Path
 import logging
+from web.utils.log_store import get_log_store
 
 logger = logging.getLogger(__name__)
 
-LOG_FILE = Path("logs/user_log.jsonl")
+LOG_NAME = "user_log.jsonl"
 
-def get_recent_logs(limit=50, log_path=LOG_FILE):
-    if not log_path.exists():
-        return {"count": 0, "logs": []}
-
-    with open(log_path, "r") as f:
-        lines = f.readlines()
-
-    logs = []
-    for line in lines[-limit:]:
-        try:
-            logs.append(json.loads(line))
-        except json.JSONDecodeError:
-            continue
-    logger.info(f"Fetched {len(logs)} logs from {log_path}")
+def get_recent_logs(limit=50, log_name=LOG_NAME, skip=0, contains=None):
+    logs = get_log_store(log_name).tail(limit, skip=skip, contains=contains)
+    logger.info(f"Fetched {len(logs)} logs from {log_name}")
     return {
         "count": len(logs),
         "logs": logs
-    }
\ No newline at end of file
+    }
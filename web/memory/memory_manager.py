@@ -1,61 +1,155 @@
-from web.memory.vector_index import VectorIndex  # Ensure FAISS is correctly installed and imported
-from sentence_transformers import SentenceTransformer
+from web.memory.vector_shards import get_shared_index, DEFAULT_SHARD
+from web.memory.embedding_service import get_embedding_service, DEFAULT_MODEL
 import numpy as np
-import json
-from pathlib import Path
+import os
 from datetime import datetime
-from web.memory.summarizer_engine import Summarizer
+from web.utils.lazy_loader import get_summarizer
+from web.memory.ingest_queue import get_ingest_queue
 from web.utils.logger import log_to_file
+from web.utils.log_store import get_log_store
 
-LOG_PATH = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
+METADATA_FIELDS = ("intent", "source", "session_id", "model", "timestamp", "summary")
+# "session_id" or "user" stores each tenant's memories in its own index shard;
+# empty keeps everything in the single default index.
+SHARD_BY = os.getenv("MEMORY_SHARD_BY", "").lower()
 
 class MemoryManager:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name, device="cpu")
-        self.index = VectorIndex(dim=self.model.get_sentence_embedding_dimension())
-        self.summarizer = Summarizer()
+    def __init__(self, model_name=DEFAULT_MODEL):
+        # The embedding model and index are shared by every MemoryManager in the process.
+        self.embedder = get_embedding_service(model_name)
+        self.shards = get_shared_index(self.embedder.dim)
+        self.index = self.shards.shard(DEFAULT_SHARD)
+
+    @property
+    def summarizer(self):
+        # Looked up on each use so the model registry can unload it when idle.
+        summarizer = get_summarizer()
+        if summarizer is None:
+            raise RuntimeError("Summarizer is unavailable")
+        return summarizer
 
     def encode_text(self, text: str) -> np.ndarray:
-        return self.model.encode(text, convert_to_numpy=True)
+        return self.embedder.encode(text)
+
+    def encode_texts(self, texts: list) -> np.ndarray:
+        return self.embedder.encode_batch(texts)
 
-    def store_text(self, identifier: str, text: str):
+    def store_text(self, identifier: str, text: str, metadata: dict = None):
         vector = self.encode_text(text)
-        self.index.add(vector, identifier)
+        self.index.add(vector, identifier, metadata)
+        self.index.save()
+
+    def store_texts(self, identifiers: list, texts: list) -> int:
+        if not texts:
+            return 0
+        added = self.index.add_many(self.encode_texts(texts), identifiers)
         self.index.save()
+        return added
 
-    def retrieve_similar(self, query: str, top_k=5):
+    def retrieve_similar(self, query: str, top_k=5, nprobe=None, ef_search=None, shards=None):
+        """Top-k (id, score) pairs; `shards` limits the search to those tenants (see ShardedVectorIndex.query_many)."""
         query_vector = self.encode_text(query)
-        return self.index.query(query_vector, top_k=top_k)
+        matches = self.shards.query(query_vector, top_k=top_k, shards=shards, nprobe=nprobe, ef_search=ef_search)
+        return [(identifier, score) for identifier, score, _ in matches]
+
+    def retrieve_similar_many(self, queries: list, top_k=5, nprobe=None, ef_search=None, shards=None):
+        if not queries:
+            return []
+        results = self.shards.query_many(
+            self.encode_texts(queries), top_k=top_k, shards=shards, nprobe=nprobe, ef_search=ef_search
+        )
+        return [[(identifier, score) for identifier, score, _ in matches] for matches in results]
+
+    def shard_for(self, log_entry: dict) -> str:
+        """The shard a log entry belongs to under MEMORY_SHARD_BY."""
+        key = None
+        if SHARD_BY == "session_id":
+            key = log_entry.get("session_id")
+        elif SHARD_BY == "user":
+            user = log_entry.get("user")
+            key = user.get("name") if isinstance(user, dict) else user
+        return f"{SHARD_BY}-{key}" if key else DEFAULT_SHARD
 
     def reset_memory(self):
-        self.index = VectorIndex(dim=self.model.get_sentence_embedding_dimension())
+        # The index is shared process-wide, so reload it in place rather than replacing it.
+        self.shards.unload(DEFAULT_SHARD)
+        self.index = self.shards.shard(DEFAULT_SHARD)
         self.index.save()
 
-    def store_log_entry(self, log_entry: dict):
+    def store_log_entry(self, log_entry: dict, wait: bool = False):
+        """
+        Summarize, classify, embed and log `log_entry` on the background ingest
+        queue (inline with wait=True). Call flush() to wait for queued entries.
+        """
         if "timestamp" not in log_entry:
             log_entry["timestamp"] = datetime.utcnow().isoformat()
+        if wait:
+            self._ingest_log_entries([log_entry])
+        else:
+            # A copy, so the caller can keep using its dict while the worker fills in the summary.
+            get_ingest_queue().submit_batched(self._ingest_log_entries, dict(log_entry))
 
-        text = log_entry.get("text", "")
-        if not text:
-            return
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every log entry stored so far has been ingested. Returns False on timeout."""
+        return get_ingest_queue().flush(timeout)
 
-        identifier = log_entry["timestamp"]
+    def _ingest_log_entries(self, log_entries: list):
+        # The ingest worker hands over everything queued at once, so the entries
+        # share one batched summarizer call and one embedding batch.
+        log_entries = [log_entry for log_entry in log_entries if log_entry.get("text")]
+        if not log_entries:
+            return
 
+        texts = [log_entry["text"] for log_entry in log_entries]
         try:
-            log_entry["summary"] = self.summarizer.summarize(text)
-            log_entry["intent"] = self.classify_intent(text)
-            vector = self.encode_text(text)
-            self.index.add(vector, identifier)
-            self.index.save()
+            summaries = self.summarizer.summarize_many(texts)
+            vectors = self.encode_texts(texts)
         except Exception as e:
-            log_entry["summary"] = "summarization_failed"
-            log_entry["intent"] = "unknown"
-            log_entry["error"] = str(e)
+            summaries, vectors = None, None
+            for log_entry in log_entries:
+                self._mark_failed(log_entry, e)
+
+        if vectors is not None:
+            shards = {}
+            for log_entry, summary, vector in zip(log_entries, summaries, vectors):
+                try:
+                    log_entry["summary"] = summary
+                    log_entry["intent"] = self.classify_intent(log_entry["text"])
+                    metadata = {field: log_entry[field] for field in METADATA_FIELDS if field in log_entry}
+                    shard = self.shard_for(log_entry)
+                    self.shards.add(vector, log_entry["timestamp"], shard=shard, metadata=metadata)
+                    shards.setdefault(shard, []).append(log_entry)
+                except Exception as e:
+                    self._mark_failed(log_entry, e)
+            for shard, shard_entries in shards.items():
+                try:
+                    self.shards.save([shard])
+                except Exception as e:
+                    for log_entry in shard_entries:
+                        self._mark_failed(log_entry, e)
+
+        for log_entry in log_entries:
+            log_to_file(log_entry, filename="user_log.jsonl")
 
-        log_to_file(log_entry, filename="user_log.jsonl")
+    @staticmethod
+    def _mark_failed(log_entry: dict, error: Exception):
+        log_entry["summary"] = "summarization_failed"
+        log_entry["intent"] = "unknown"
+        log_entry["error"] = str(error)
+
+    def remove_entry(self, identifier: str, shard: str = DEFAULT_SHARD) -> bool:
+        removed = self.shards.remove(identifier, shard=shard)
+        if removed:
+            self.shards.save([shard])
+        return removed
+
+    def update_text(self, identifier: str, text: str, shard: str = DEFAULT_SHARD):
+        index = self.shards.shard(shard)
+        index.upsert(self.encode_text(text), identifier, index.get_metadata(identifier))
+        index.save()
 
     def get_index_size(self) -> int:
-        return len(self.index.id_map)
+        return self.shards.size
     def classify_intent(self, text: str) -> str:
         text = text.lower()
         if "how do" in text or "how to" in text:
@@ -66,15 +160,22 @@ class MemoryManager:
             return "instruction"
         return "note"
 
-    def search_by_summary(self, query: str, top_k=5):
+    def search_by_summary(self, query: str, top_k=5, filters=None, nprobe=None, ef_search=None, shards=None):
+        """
+        Top-k stored entries for `query` as dicts of id, score, shard and stored metadata.
+        `filters` such as {"intent": "error"} are applied inside the vector search.
+        """
         query_vector = self.encode_text(query)
-        return self.index.query(query_vector, top_k=top_k)
+        matches = self.shards.query(
+            query_vector, top_k=top_k, shards=shards, nprobe=nprobe, ef_search=ef_search, filters=filters
+        )
+        return [
+            {"id": identifier, "score": score, "shard": shard, **self.shards.shard(shard).get_metadata(identifier)}
+            for identifier, score, shard in matches
+        ]
 
-    def get_log_entries(self, limit=100):
-        if not LOG_PATH.exists():
-            return []
-        with LOG_PATH.open("r", encoding="utf-8") as f:
-            return [json.loads(line) for line in f.readlines()[-limit:]]
+    def get_log_entries(self, limit=100, skip=0):
+        return get_log_store("user_log.jsonl").tail(limit, skip=skip)
 
 if __name__ == "__main__":
     try:
@@ -1,22 +1,189 @@
 from transformers import pipeline
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import List
 from transformers.pipelines import Pipeline
+from web.utils.cpu_inference import CPU_OPTIMIZE, configure_threads, inference_context, quantize_linear
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+# Inputs longer than this many tokens are split into chunks that are summarized
+# together and then summarized again (map-reduce) instead of being truncated.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "900"))
+# Map-reduce rounds before whatever is left is truncated to one chunk.
+SUMMARY_MAX_REDUCE_DEPTH = int(os.getenv("SUMMARY_MAX_REDUCE_DEPTH", "3"))
+
+FAILED = "❌ Summarization failed."
+
 class Summarizer:
-    def __init__(self):
+    def __init__(self, optimize: bool = CPU_OPTIMIZE):
         self.summarizer: Pipeline = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+        self.optimize = optimize
+        if optimize:
+            configure_threads()
+            self.summarizer.model = quantize_linear(self.summarizer.model)
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._lock = threading.Lock()  # one pipeline call at a time
 
     def summarize(self, text: str, max_length: int = 130, min_length: int = 30) -> str:
-        if not text.strip():
-            return "⚠️ No content to summarize."
-        try:
-            result = self.summarizer(text, max_length=max_length, min_length=min_length, do_sample=False)
-            return result[0]['summary_text']
-        except Exception as e:
-            logger.error(f"Summarization failed: {e}")
-            return "❌ Summarization failed."
+        return self.summarize_many([text], max_length=max_length, min_length=min_length)[0]
+
+    def summarize_many(self, texts: List[str], max_length: int = 130, min_length: int = 30,
+                       batch_size: int = SUMMARY_BATCH_SIZE) -> List[str]:
+        """
+        Summaries for `texts`, in order. Texts shorter than min_length tokens are
+        returned as they are, repeats are served from the cache, and the rest go
+        through the pipeline in length-sorted batches to keep padding low. Texts
+        over the chunk limit are map-reduced: their chunks are summarized in the
+        same batches, and the joined chunk summaries are summarized again.
+        """
+        return self._summarize_many(texts, max_length, min_length, batch_size, depth=0)
+
+    def _summarize_many(self, texts: List[str], max_length: int, min_length: int, batch_size: int,
+                        depth: int) -> List[str]:
+        results = [None] * len(texts)
+        uncached = {}  # cache key -> (text, result positions)
+        for position, text in enumerate(texts):
+            if not text.strip():
+                results[position] = "⚠️ No content to summarize."
+                continue
+            key = self._key(text, max_length, min_length)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[position] = cached
+            elif key in uncached:
+                uncached[key][1].append(position)
+            else:
+                uncached[key] = (text, [position])
+
+        pending = {}  # cache key -> (text, token count, result positions)
+        counts = self._tokenize([text for text, _ in uncached.values()], truncation=False)["input_ids"] if uncached else []
+        for (key, (text, positions)), ids in zip(uncached.items(), counts):
+            if len(ids) < min_length:
+                for position in positions:
+                    results[position] = text
+            else:
+                pending[key] = (text, len(ids), positions)
+
+        limit = self._chunk_tokens()
+        long_keys = [key for key in pending if pending[key][1] > limit]
+        if depth >= SUMMARY_MAX_REDUCE_DEPTH:
+            for key in long_keys:
+                text, _, positions = pending[key]
+                pending[key] = (self._truncate(text, limit), limit, positions)
+            long_keys = []
+        summaries = {}
+        if long_keys:
+            summaries.update(self._map_reduce(long_keys, pending, limit, max_length, min_length, batch_size, depth))
+
+        keys = sorted((key for key in pending if pending[key][1] <= limit), key=lambda key: pending[key][1])
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            try:
+                with self._lock, inference_context(self.optimize):
+                    outputs = self.summarizer(
+                        [pending[key][0] for key in batch], max_length=max_length, min_length=min_length,
+                        do_sample=False, truncation=True, batch_size=len(batch)
+                    )
+            except Exception as e:
+                logger.error(f"Summarization failed: {e}")
+                summaries.update((key, FAILED) for key in batch)
+                continue
+            summaries.update((key, output['summary_text']) for key, output in zip(batch, outputs))
+
+        for key, summary in summaries.items():
+            if summary != FAILED:
+                self._cache_put(key, summary)
+            for position in pending[key][2]:
+                results[position] = summary
+        return results
+
+    def _map_reduce(self, keys: list, pending: dict, limit: int, max_length: int, min_length: int,
+                    batch_size: int, depth: int) -> dict:
+        chunks = {key: self._split(pending[key][0], limit) for key in keys}
+        # Chunk summaries are capped at a quarter chunk so each round shrinks the text,
+        # whatever lengths the caller asked for the final summary.
+        chunk_max = min(max_length, max(1, limit // 4))
+        chunk_min = min(min_length, chunk_max // 2)
+        # Every chunk of every long text goes through one call, so they share batches.
+        flat = [chunk for key in keys for chunk in chunks[key]]
+        chunk_summaries = iter(self._summarize_many(flat, chunk_max, chunk_min, batch_size, depth + 1))
+        combined, failed = {}, set()
+        for key in keys:
+            parts = [next(chunk_summaries) for _ in chunks[key]]
+            if FAILED in parts:
+                failed.add(key)
+            else:
+                combined[key] = "\n".join(parts)
+        reduce_keys = list(combined)
+        counts = self._tokenize([combined[key] for key in reduce_keys], truncation=False)["input_ids"] if reduce_keys else []
+        for key, ids in zip(reduce_keys, counts):
+            if len(ids) >= pending[key][1]:
+                # No progress this round (e.g. chunks too short to shrink); cut it to one chunk.
+                combined[key] = self._truncate(combined[key], limit)
+        # The joined summaries may still be over the limit; the next round reduces them again.
+        reduced = self._summarize_many([combined[key] for key in reduce_keys], max_length, min_length,
+                                       batch_size, depth + 1)
+        return {**dict(zip(reduce_keys, reduced)), **{key: FAILED for key in failed}}
+
+    def _split(self, text: str, limit: int) -> List[str]:
+        """Split `text` into chunks of at most ~`limit` tokens, on line boundaries where possible."""
+        lines = text.splitlines(keepends=True)
+        counts = [len(ids) for ids in self._tokenize(lines, truncation=False)["input_ids"]]
+        chunks, current, current_tokens = [], [], 0
+        for line, count in zip(lines, counts):
+            if current and current_tokens + count > limit:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            if count > limit:
+                # A single overlong line is cut at token boundaries.
+                offsets = self._tokenize(line, truncation=False, return_offsets_mapping=True)["offset_mapping"]
+                for start in range(0, len(offsets), limit):
+                    window = offsets[start:start + limit]
+                    chunks.append(line[window[0][0]:window[-1][1]])
+                continue
+            current.append(line)
+            current_tokens += count
+        if current:
+            chunks.append("".join(current))
+        return [chunk for chunk in chunks if chunk.strip()]
+
+    def _truncate(self, text: str, limit: int) -> str:
+        offsets = self._tokenize(text, truncation=False, return_offsets_mapping=True)["offset_mapping"]
+        return text[:offsets[limit - 1][1]] if len(offsets) > limit else text
+
+    def _tokenize(self, text, **kwargs):
+        # The fast tokenizer is shared with the pipeline, which switches its truncation
+        # settings per call, so it must never be used concurrently with it.
+        with self._lock:
+            return self.summarizer.tokenizer(text, add_special_tokens=False, **kwargs)
+
+    def _chunk_tokens(self) -> int:
+        # Leave room for the BOS/EOS tokens the pipeline adds.
+        return min(SUMMARY_CHUNK_TOKENS, self.summarizer.tokenizer.model_max_length - 2)
+
+    @staticmethod
+    def _key(text: str, max_length: int, min_length: int) -> bytes:
+        return hashlib.blake2b(f"{max_length}:{min_length}:{text.strip()}".encode("utf-8"), digest_size=16).digest()
+
+    def _cache_get(self, key: bytes):
+        with self._cache_lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+            return summary
+
+    def _cache_put(self, key: bytes, summary: str):
+        with self._cache_lock:
+            self._cache[key] = summary
+            while len(self._cache) > SUMMARY_CACHE_SIZE:
+                self._cache.popitem(last=False)
 
 if __name__ == "__main__":
     s = Summarizer()
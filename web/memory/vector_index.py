@@ -1,54 +1,481 @@
 import faiss
 import numpy as np
 import os
-import pickle
-from typing import List, Tuple
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from web.memory import ann_backends
+from web.memory.id_table import IDTable
+from web.memory.vector_metadata import VectorMetadata
+from web.memory.vector_journal import VectorJournal, OP_ADD, OP_DELETE
 
 INDEX_PATH = "web/memory/faiss_index.index"
-ID_MAP_PATH = "web/memory/id_map.pkl"
+ID_TABLE_PATH = "web/memory/id_table.bin"
+ID_MAP_PATH = "web/memory/id_map.pkl"  # legacy pickled id map, read only to migrate old checkpoints
+JOURNAL_PATH = "web/memory/faiss_index.journal"
+TOMBSTONE_PATH = "web/memory/faiss_index.tombstones.npy"
+METADATA_PATH = "web/memory/faiss_index.meta.npz"
+# Named shards keep the same set of files under SHARD_DIR/<name>/.
+SHARD_DIR = "web/memory/shards"
+
+# Open checkpoints with FAISS's mmap so every worker process shares one
+# page-cached copy. On the pinned faiss-cpu 1.7.4 (requirements.txt) only the
+# IVF backends (ivf_flat, ivf_pq) can be mapped, so the setting has no effect
+# for the default hnsw backend or the flat index; faiss builds with
+# IO_FLAG_MMAP_IFC map those too. A mapped index is read-only: the first write
+# in a process re-reads the whole index into process memory (so a writer holds
+# a private copy), and each checkpoint maps it again.
+MMAP_INDEX = os.getenv("VECTOR_MMAP", "false").lower() == "true"
+
+# "journal" appends new vectors to JOURNAL_PATH and only rewrites the full index on
+# checkpoint; "snapshot" rewrites the index and id map on every save().
+PERSISTENCE_MODE = os.getenv("VECTOR_PERSISTENCE", "journal").lower()
+CHECKPOINT_MAX_BYTES = int(os.getenv("VECTOR_CHECKPOINT_BYTES", str(64 * 1024 * 1024)))
+CHECKPOINT_INTERVAL = float(os.getenv("VECTOR_CHECKPOINT_SECONDS", "300"))
+
+# The index starts as a brute-force flat index and is trained and migrated to
+# VECTOR_BACKEND (flat, ivf_flat, ivf_pq or hnsw) once it holds MIGRATE_THRESHOLD vectors.
+BACKEND = os.getenv("VECTOR_BACKEND", "hnsw").lower()
+MIGRATE_THRESHOLD = int(os.getenv("VECTOR_MIGRATE_THRESHOLD", "20000"))
+
+# Store vectors scalar-quantized ("none", "fp16" or "int8"). int8 learns its
+# per-dimension ranges, so it only kicks in once SQ_TRAIN_MIN vectors exist.
+QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+SQ_TRAIN_MIN = int(os.getenv("VECTOR_SQ_TRAIN_MIN", "1000"))
+
+# Removed entries are tombstoned and hidden from search; once they make up
+# COMPACT_RATIO of the index a background compaction reclaims their space.
+COMPACT_RATIO = float(os.getenv("VECTOR_COMPACT_RATIO", "0.2"))
+COMPACT_MIN_TOMBSTONES = int(os.getenv("VECTOR_COMPACT_MIN_TOMBSTONES", "100"))
+
+# A filter matching at most this many vectors is answered by an exact scan over
+# just those vectors instead of a filtered ANN search.
+EXACT_FILTER_MAX = int(os.getenv("VECTOR_EXACT_FILTER_MAX", "4096"))
 
 class VectorIndex:
-    def __init__(self, dim: int):
+    def __init__(self, dim: int, persistence: str = PERSISTENCE_MODE, backend: str = BACKEND,
+                 name: Optional[str] = None, mmap: bool = MMAP_INDEX, quantization: str = QUANTIZATION):
+        if backend not in ann_backends.BACKENDS:
+            raise ValueError(f"Unknown vector backend '{backend}'. Expected one of {ann_backends.BACKENDS}.")
+        if quantization not in ann_backends.QUANTIZATIONS:
+            raise ValueError(f"Unknown vector quantization '{quantization}'. Expected one of {ann_backends.QUANTIZATIONS}.")
+        self.name = name
+        self.index_path = INDEX_PATH
+        self.id_table_path = ID_TABLE_PATH
+        self.id_map_path = ID_MAP_PATH
+        self.journal_path = JOURNAL_PATH
+        self.tombstone_path = TOMBSTONE_PATH
+        self.metadata_path = METADATA_PATH
+        if name is not None:
+            shard_dir = os.path.join(SHARD_DIR, name)
+            os.makedirs(shard_dir, exist_ok=True)
+            for attr in ("index_path", "id_table_path", "id_map_path", "journal_path", "tombstone_path", "metadata_path"):
+                setattr(self, attr, os.path.join(shard_dir, os.path.basename(getattr(self, attr))))
         self.dim = dim
-        base_index = faiss.IndexFlatIP(dim)
+        self.persistence = persistence
+        self.backend = backend
+        self.quantization = quantization
+        self.mmap = mmap
+        self._mapped = False  # self.index currently points at read-only mmapped pages
+        base_index = ann_backends.build_index("flat", dim, 0, "fp16" if quantization == "fp16" else "none")
         self.index = faiss.IndexIDMap(base_index)
-        self.id_map = []  # Track string IDs
-        self.reverse_id_map = {}  # string ID -> numeric ID
-        self.next_id = 0
-        if os.path.exists(INDEX_PATH) and os.path.exists(ID_MAP_PATH):
+        self.id_map = IDTable()  # numeric ID <-> string ID
+        self.tombstones = set()  # numeric IDs removed since the last compaction
+        self.metadata = VectorMetadata()  # intent/source/session_id/model/timestamp per numeric ID
+        self.journal = VectorJournal(self.journal_path)
+        self._pending = []  # journal records not yet flushed by save()
+        self._dirty = False  # changed since the last checkpoint
+        self._last_checkpoint = time.time()
+        self._tombstone_selector = None
+        self._lock = threading.RLock()
+        self._compaction = None
+        self._migration = None
+        self._generation = 0  # bumped whenever migration or compaction replaces the index
+        if os.path.exists(self.index_path) and (os.path.exists(self.id_table_path) or os.path.exists(self.id_map_path)):
             self.load()
+        self._replay_journal()
+
+    def add(self, vector: np.ndarray, id_str: str, metadata: Optional[dict] = None):
+        self.add_many(vector.reshape(1, -1), [id_str], [metadata])
+
+    def add_many(self, vectors: np.ndarray, id_strs: List[str], metadata: Optional[List[Optional[dict]]] = None) -> int:
+        """Add a (n, dim) matrix of vectors in one FAISS call. Returns how many were new."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(id_strs):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(id_strs)} IDs.")
+        if metadata is None:
+            metadata = [None] * len(id_strs)
+        with self._lock:
+            keep = []
+            seen = set()
+            for row, id_str in enumerate(id_strs):
+                if self.contains(id_str) or id_str in seen:
+                    print(f"[VectorIndex] Duplicate ID '{id_str}' — skipping.")
+                    continue
+                seen.add(id_str)
+                keep.append(row)
+            if not keep:
+                return 0
+            kept_ids = [id_strs[row] for row in keep]
+            kept_metadata = [metadata[row] for row in keep]
+            norm_vectors = _normalize(vectors[keep])
+            self._add_normalized(norm_vectors, kept_ids, kept_metadata)
+            if self.persistence == "journal":
+                self._pending.extend(
+                    (OP_ADD, id_str, vec, meta) for id_str, vec, meta in zip(kept_ids, norm_vectors, kept_metadata)
+                )
+            return len(kept_ids)
+
+    def remove(self, id_str: str) -> bool:
+        """Tombstone `id_str` so it no longer shows up in queries. Returns False if it was not present."""
+        with self._lock:
+            if not self._remove(id_str):
+                return False
+            if self.persistence == "journal":
+                self._pending.append((OP_DELETE, id_str, None, None))
+            self._maybe_compact()
+            return True
+
+    def upsert(self, vector: np.ndarray, id_str: str, metadata: Optional[dict] = None):
+        """Replace the vector stored under `id_str`, or add it if it is new."""
+        with self._lock:
+            self.remove(id_str)
+            self.add(vector, id_str, metadata)
+
+    def get_metadata(self, id_str: str) -> dict:
+        numeric_id = self.id_map.get(id_str)
+        return self.metadata.get(numeric_id) if numeric_id is not None else {}
+
+    def contains(self, id_str: str) -> bool:
+        numeric_id = self.id_map.get(id_str)
+        return numeric_id is not None and numeric_id not in self.tombstones
+
+    def _remove(self, id_str: str) -> bool:
+        numeric_id = self.id_map.get(id_str)
+        if numeric_id is None or numeric_id in self.tombstones:
+            return False
+        self.tombstones.add(numeric_id)
+        self._tombstone_selector = None
+        self._dirty = True
+        return True
+
+    def _add_normalized(self, norm_vectors: np.ndarray, id_strs: List[str], metadata: List[Optional[dict]]):
+        self._ensure_writable()
+        numeric_ids = np.arange(self.next_id, self.next_id + len(id_strs), dtype=np.int64)
+        self.index.add_with_ids(np.ascontiguousarray(norm_vectors, dtype=np.float32), numeric_ids)
+        for id_str, meta in zip(id_strs, metadata):
+            self.metadata.set(self.id_map.append(id_str), meta)
+        self._dirty = True
+
+    def query(self, vector: np.ndarray, top_k: int = 5, nprobe: Optional[int] = None,
+              ef_search: Optional[int] = None, filters: Optional[dict] = None) -> List[Tuple[str, float]]:
+        return self.query_many(vector.reshape(1, -1), top_k=top_k, nprobe=nprobe,
+                               ef_search=ef_search, filters=filters)[0]
+
+    def query_many(self, vectors: np.ndarray, top_k: int = 5, nprobe: Optional[int] = None,
+                   ef_search: Optional[int] = None, filters: Optional[dict] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Search a (n, dim) matrix of queries in one FAISS call; one result list per row.
+        `filters` (see VectorMetadata.mask) is applied inside the search. On the flat
+        index that is exact; on IVF/HNSW a filter matching at most EXACT_FILTER_MAX
+        vectors is scanned exactly, and a broader one widens nprobe/efSearch by how
+        selective it is, so recall stays close to that of an unfiltered search.
+        """
+        norm_vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        filters = {column: value for column, value in (filters or {}).items() if value not in (None, "")}
+        with self._lock:
+            if not filters:
+                params = ann_backends.search_params(self.index, nprobe=nprobe, ef_search=ef_search,
+                                                    selector=self._live_selector())
+                return self._resolve(*self.index.search(norm_vectors, top_k, params=params))
+            mask = self._filter_mask(filters)
+            matching = np.flatnonzero(mask)
+            if not len(matching):
+                return [[] for _ in norm_vectors]
+            # Positions in the wrapped index equal numeric IDs while nothing is missing from it.
+            if (self.active_backend != "flat" and len(matching) <= EXACT_FILTER_MAX
+                    and self.index.ntotal == self.next_id):
+                return self._resolve(*self._exact_search(norm_vectors, matching, top_k))
+            selector = faiss.IDSelectorBitmap(np.packbits(mask, bitorder="little"))
+            params = ann_backends.search_params(self.index, nprobe=nprobe, ef_search=ef_search, selector=selector,
+                                                selectivity=len(matching) / max(1, self.index.ntotal))
+            return self._resolve(*self.index.search(norm_vectors, top_k, params=params))
+
+    def _filter_mask(self, filters: dict) -> np.ndarray:
+        mask = self.metadata.mask(filters, self.next_id)
+        if self.tombstones:
+            mask[np.fromiter(self.tombstones, dtype=np.int64)] = False
+        return mask
+
+    def _exact_search(self, norm_vectors: np.ndarray, numeric_ids: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        stored = ann_backends.reconstruct(faiss.downcast_index(self.index.index), numeric_ids)
+        scores = norm_vectors @ stored.T
+        k = min(top_k, len(numeric_ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), numeric_ids[np.take_along_axis(top, order, axis=1)]
+
+    def _live_selector(self) -> Optional[faiss.IDSelector]:
+        if not self.tombstones:
+            return None
+        if self._tombstone_selector is None:
+            removed = faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64))
+            # IDSelectorNot does not own its argument, so keep both alive together.
+            self._tombstone_selector = (faiss.IDSelectorNot(removed), removed)
+        return self._tombstone_selector[0]
+
+    def _resolve(self, scores: np.ndarray, indices: np.ndarray) -> List[List[Tuple[str, float]]]:
+        all_results = []
+        for row_scores, row_indices in zip(scores, indices):
+            results = []
+            for score, numeric_id in zip(row_scores, row_indices):
+                if numeric_id == -1:
+                    continue
+                if numeric_id < len(self.id_map):
+                    results.append((self.id_map[numeric_id], float(score)))
+            all_results.append(results)
+        return all_results
+
+    @property
+    def next_id(self) -> int:
+        return len(self.id_map)
 
-    def add(self, vector: np.ndarray, id_str: str):
-        if id_str in self.reverse_id_map:
-            print(f"[VectorIndex] Duplicate ID '{id_str}' — skipping.")
+    @property
+    def size(self) -> int:
+        return len(self.id_map) - len(self.tombstones)
+
+    @property
+    def dirty(self) -> bool:
+        """True if the index has changes that are not in its checkpoint yet."""
+        return self._dirty
+
+    @property
+    def active_backend(self) -> str:
+        return ann_backends.backend_of(self.index)
+
+    @property
+    def active_quantization(self) -> str:
+        return ann_backends.quantization_of(self.index)
+
+    def _migration_target(self) -> Tuple[str, str]:
+        backend = self.active_backend
+        if backend == "flat" and self.index.ntotal >= MIGRATE_THRESHOLD:
+            backend = self.backend
+        quantization = self.quantization
+        if backend == "ivf_pq":
+            quantization = "none"
+        elif quantization == "int8" and self.index.ntotal < SQ_TRAIN_MIN:
+            quantization = self.active_quantization
+        return backend, quantization
+
+    def needs_migration(self) -> bool:
+        return self._migration_target() != (self.active_backend, self.active_quantization)
+
+    def migrate(self) -> bool:
+        """
+        Rebuild the index as the migration target and checkpoint it. The new index
+        is built from a snapshot without holding the lock, so queries and writes
+        keep using the old one meanwhile; vectors added in between are copied
+        over when it is swapped in. Returns False if a compaction got in the way.
+        """
+        start = time.time()
+        with self._lock:
+            backend, quantization = self._migration_target()
+            snapshot = self._snapshot()
+            generation = self._generation
+        migrated = ann_backends.migrate(snapshot, backend, self.dim, quantization)
+        with self._lock:
+            if generation != self._generation:
+                print("[VectorIndex] Index was replaced during migration; retrying on the next save.")
+                return False
+            ann_backends.copy_tail(self.index, migrated, snapshot.ntotal)
+            self.index = migrated
+            self._mapped = False
+            self._tombstone_selector = None
+            self._generation += 1
+            # Migration changes the on-disk index type, so always follow it with a checkpoint.
+            self.checkpoint()
+        print(f"[VectorIndex] Migrated {migrated.ntotal} vectors to '{backend}' "
+              f"(quantization: {quantization}) in {time.time() - start:.1f}s.")
+        return True
+
+    def _maybe_migrate(self):
+        if not self.needs_migration() or (self._migration and self._migration.is_alive()):
             return
-        norm_vector = vector / (np.linalg.norm(vector) + 1e-10)
-        numeric_id = self.next_id
-        self.index.add_with_ids(norm_vector.reshape(1, -1), np.array([numeric_id]))
-        self.reverse_id_map[id_str] = numeric_id
-        self.id_map.append(id_str)
-        self.next_id += 1
-
-    def query(self, vector: np.ndarray, top_k: int = 5) -> List[Tuple[str, float]]:
-        norm_vector = vector / (np.linalg.norm(vector) + 1e-10)
-        scores, indices = self.index.search(norm_vector.reshape(1, -1), top_k)
-        results = []
-        for idx, numeric_id in enumerate(indices[0]):
-            if numeric_id == -1:
-                continue
-            if numeric_id < len(self.id_map):
-                results.append((self.id_map[numeric_id], float(scores[0][idx])))
-        return results
+        self._migration = threading.Thread(target=self.migrate, name="vector-index-migration", daemon=True)
+        self._migration.start()
+
+    def bytes_per_vector(self) -> float:
+        """Serialized index size per stored vector, including graph/list overhead."""
+        with self._lock:
+            return faiss.serialize_index(self.index).nbytes / max(1, self.index.ntotal)
 
     def save(self):
-        faiss.write_index(self.index, INDEX_PATH)
-        with open(ID_MAP_PATH, "wb") as f:
-            pickle.dump((self.id_map, self.reverse_id_map, self.next_id), f)
+        with self._lock:
+            # Runs in the background; this save persists the current index as usual.
+            self._maybe_migrate()
+            if self.persistence != "journal":
+                self.checkpoint()
+                return
+            self.journal.append(self._pending)
+            self._pending = []
+            if (self.journal.size() >= CHECKPOINT_MAX_BYTES
+                    or time.time() - self._last_checkpoint >= CHECKPOINT_INTERVAL):
+                self.checkpoint()
+
+    def checkpoint(self):
+        with self._lock:
+            # Write to temp files first so a crash never leaves a half-written checkpoint;
+            # the journal is only cleared once all files are in place. A mapped index has not
+            # changed since it was read, and FAISS would write its mapped lists as a dangling
+            # reference, so its file is left as it is.
+            if not self._mapped:
+                faiss.write_index(self.index, self.index_path + ".tmp")
+            self.id_map.write(self.id_table_path + ".tmp", exclude=self.tombstones)
+            with open(self.tombstone_path + ".tmp", "wb") as f:
+                np.save(f, np.fromiter(self.tombstones, dtype=np.int64))
+            with open(self.metadata_path + ".tmp", "wb") as f:
+                self.metadata.save(f)
+            if not self._mapped:
+                os.replace(self.index_path + ".tmp", self.index_path)
+            os.replace(self.id_table_path + ".tmp", self.id_table_path)
+            os.replace(self.tombstone_path + ".tmp", self.tombstone_path)
+            os.replace(self.metadata_path + ".tmp", self.metadata_path)
+            # Re-open the table so checkpointed IDs move from the in-memory tail to the mmap.
+            self.id_map = IDTable.load(self.id_table_path)
+            if self.mmap and not self._mapped:
+                self._read_index()
+            self.journal.truncate()
+            self._pending = []
+            self._last_checkpoint = time.time()
+            self._dirty = False
+
+    def compact(self) -> bool:
+        """
+        Drop tombstoned vectors from FAISS and the ID table, renumbering the
+        survivors. Like migrate(), the compacted index is built from a snapshot
+        without holding the lock; adds and removes made meanwhile are applied
+        when it is swapped in. Returns False if nothing was compacted.
+        """
+        start = time.time()
+        with self._lock:
+            if not self.tombstones:
+                return False
+            snapshot = self._snapshot()
+            removed = np.fromiter(self.tombstones, dtype=np.int64)
+            id_map = self.id_map
+            generation = self._generation
+        size = snapshot.ntotal
+        dead = np.zeros(size, dtype=bool)
+        dead[removed] = True
+        new_ids = np.cumsum(~dead, dtype=np.int64) - 1
+        new_ids[dead] = -1
+        compacted_index = ann_backends.compact(snapshot, self.dim, new_ids)
+        compacted = IDTable()
+        for numeric_id in np.flatnonzero(~dead):
+            compacted.append(id_map[numeric_id])
+
+        with self._lock:
+            if generation != self._generation:
+                print("[VectorIndex] Index was replaced during compaction; retrying later.")
+                return False
+            # Entries added during the build follow the survivors in the same order.
+            new_ids = np.concatenate([new_ids, np.arange(size, self.next_id, dtype=np.int64) - len(removed)])
+            ann_backends.copy_tail(self.index, compacted_index, size, new_ids)
+            for numeric_id in range(size, self.next_id):
+                compacted.append(self.id_map[numeric_id])
+            self.metadata = self.metadata.take(np.flatnonzero(new_ids >= 0))
+            # Entries removed during the build stay tombstoned under their new numbers.
+            self.tombstones = {int(new_ids[numeric_id]) for numeric_id in self.tombstones if new_ids[numeric_id] >= 0}
+            self.index = compacted_index
+            self.id_map = compacted
+            self._mapped = False
+            self._tombstone_selector = None
+            self._generation += 1
+            # Journal records refer to string IDs, but the checkpoint must match the new numbering.
+            self.checkpoint()
+        print(f"[VectorIndex] Compacted {len(removed)} removed entries in {time.time() - start:.1f}s.")
+        return True
+
+    def needs_compaction(self) -> bool:
+        return (len(self.tombstones) >= COMPACT_MIN_TOMBSTONES
+                and len(self.tombstones) >= COMPACT_RATIO * max(1, self.index.ntotal))
+
+    def _maybe_compact(self):
+        if not self.needs_compaction() or (self._compaction and self._compaction.is_alive()):
+            return
+        self._compaction = threading.Thread(target=self.compact, name="vector-index-compaction", daemon=True)
+        self._compaction.start()
 
     def load(self):
-        loaded_index = faiss.read_index(INDEX_PATH)
+        self._read_index()
+        if os.path.exists(self.id_table_path):
+            self.id_map = IDTable.load(self.id_table_path)
+        else:
+            self.id_map = IDTable.from_legacy_pickle(self.id_map_path)
+        if os.path.exists(self.tombstone_path):
+            self.tombstones = set(np.load(self.tombstone_path).tolist())
+        if os.path.exists(self.metadata_path):
+            self.metadata = VectorMetadata.load(self.metadata_path)
+
+    def _read_index(self):
+        flags = _mmap_flags() if self.mmap else 0
+        loaded_index = faiss.read_index(self.index_path, flags)
         if not isinstance(loaded_index, faiss.IndexIDMap):
             raise RuntimeError("Expected an IndexIDMap instance in saved index.")
         self.index = loaded_index
-        with open(ID_MAP_PATH, "rb") as f:
-            self.id_map, self.reverse_id_map, self.next_id = pickle.load(f)
+        # IO_FLAG_MMAP leaves everything but IVF lists in memory; only a truly mapped index is read-only.
+        self._mapped = bool(flags) and (_CAN_MAP_ALL or self.active_backend in ("ivf_flat", "ivf_pq"))
+
+    def _snapshot(self) -> faiss.IndexIDMap:
+        # Called with self._lock held. FAISS cannot clone mapped inverted lists, but a
+        # mapped index is exactly its checkpoint, so read an in-memory copy of that instead.
+        if self._mapped:
+            return faiss.read_index(self.index_path)
+        return faiss.clone_index(self.index)
+
+    def _ensure_writable(self):
+        if self._mapped:
+            # FAISS aborts on writes to mapped storage, so load a private copy first. The
+            # mapped index is still exactly the checkpoint, since nothing could change it.
+            self.index = faiss.read_index(self.index_path)
+            self._mapped = False
+
+    def _replay_journal(self):
+        ids, vectors, metadata, queued = [], [], [], set()
+        replayed = 0
+        for op, id_str, vector, meta in self.journal.replay():
+            # Entries already folded into the checkpoint are skipped, so replay is idempotent.
+            if op == OP_ADD and not self.contains(id_str) and id_str not in queued:
+                ids.append(id_str)
+                vectors.append(vector)
+                metadata.append(meta)
+                queued.add(id_str)
+            elif op == OP_DELETE:
+                # Adds are batched; apply any queued ones first so the delete sees them.
+                if ids:
+                    self._add_normalized(np.vstack(vectors), ids, metadata)
+                    replayed += len(ids)
+                    ids, vectors, metadata, queued = [], [], [], set()
+                replayed += self._remove(id_str)
+        if ids:
+            self._add_normalized(np.vstack(vectors), ids, metadata)
+            replayed += len(ids)
+        if replayed:
+            print(f"[VectorIndex] Replayed {replayed} journal entries.")
+
+_CAN_MAP_ALL = hasattr(faiss, "IO_FLAG_MMAP_IFC")
+
+def _mmap_flags() -> int:
+    # IO_FLAG_MMAP_IFC maps flat, HNSW and IVF storage but only newer faiss builds have it;
+    # IO_FLAG_MMAP (available in the pinned 1.7.4) maps IVF inverted lists only.
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", None)
+    if mmap_flag is None:
+        print("[VectorIndex] This faiss build cannot mmap indexes; loading into memory instead.")
+        return 0
+    return mmap_flag | faiss.IO_FLAG_READ_ONLY
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
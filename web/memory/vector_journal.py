@@ -0,0 +1,72 @@
+import json
+import os
+import struct
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
+
+JOURNAL_FSYNC = os.getenv("VECTOR_JOURNAL_FSYNC", "false").lower() == "true"
+
+OP_ADD = b"A"
+OP_DELETE = b"D"
+
+# op code, id length in bytes, vector length in float32 elements, metadata JSON length in bytes
+_HEADER = struct.Struct("<cIII")
+
+JournalRecord = Tuple[bytes, str, Optional[np.ndarray], Optional[dict]]
+
+class VectorJournal:
+    """Append-only vector/ID log that is replayed on top of the last index checkpoint."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, records: List[JournalRecord]):
+        if not records:
+            return
+        chunks = []
+        for op, id_str, vector, metadata in records:
+            id_bytes = id_str.encode("utf-8")
+            vec_bytes = b"" if vector is None else np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+            meta_bytes = json.dumps(metadata).encode("utf-8") if metadata else b""
+            chunks.append(_HEADER.pack(op, len(id_bytes), len(vec_bytes) // 4, len(meta_bytes)))
+            chunks.append(id_bytes)
+            chunks.append(vec_bytes)
+            chunks.append(meta_bytes)
+        with open(self.path, "ab") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(f.fileno())
+
+    def replay(self) -> Iterator[JournalRecord]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = memoryview(f.read())
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            op, id_len, vec_len, meta_len = _HEADER.unpack_from(data, offset)
+            end = offset + _HEADER.size + id_len + vec_len * 4 + meta_len
+            if end > len(data):
+                # Torn write from a crash mid-append; everything before it is intact.
+                print(f"[VectorJournal] Ignoring truncated record at byte {offset}.")
+                break
+            id_start = offset + _HEADER.size
+            vec_start = id_start + id_len
+            meta_start = vec_start + vec_len * 4
+            id_str = bytes(data[id_start:vec_start]).decode("utf-8")
+            vector = None
+            if vec_len:
+                vector = np.frombuffer(data[vec_start:meta_start], dtype=np.float32).copy()
+            metadata = None
+            if meta_len:
+                metadata = json.loads(bytes(data[meta_start:end]).decode("utf-8"))
+            yield op, id_str, vector, metadata
+            offset = end
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self):
+        with open(self.path, "wb"):
+            pass
@@ -0,0 +1,150 @@
+import json
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Dictionary-encoded columns that can be used as search filters.
+FILTER_COLUMNS = ("intent", "source", "session_id", "model")
+# Stored alongside each vector and returned with results, but not filterable.
+TEXT_COLUMNS = ("summary",)
+
+class VectorMetadata:
+    """
+    Columnar metadata keyed by VectorIndex numeric ID.
+
+    Filter columns hold int32 codes into a per-column vocabulary (code 0 means
+    missing), so a filter becomes one vectorized comparison per column that
+    yields a boolean mask over every numeric ID.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.codes = {column: np.zeros(0, dtype=np.int32) for column in FILTER_COLUMNS}
+        self.vocab: Dict[str, List[Optional[str]]] = {column: [None] for column in FILTER_COLUMNS}
+        self._lookup: Dict[str, Dict[str, int]] = {column: {} for column in FILTER_COLUMNS}
+        self.timestamps = np.zeros(0, dtype=np.float64)  # epoch seconds, NaN when unknown
+        self.text: Dict[str, List[str]] = {column: [] for column in TEXT_COLUMNS}
+
+    def set(self, numeric_id: int, metadata: Optional[dict]):
+        self._grow(numeric_id + 1)
+        metadata = metadata or {}
+        for column in FILTER_COLUMNS:
+            value = metadata.get(column)
+            self.codes[column][numeric_id] = self._encode(column, str(value)) if value is not None else 0
+        self.timestamps[numeric_id] = _to_epoch(metadata.get("timestamp"))
+        for column in TEXT_COLUMNS:
+            self.text[column][numeric_id] = metadata.get(column) or ""
+
+    def get(self, numeric_id: int) -> dict:
+        if numeric_id >= self.count:
+            return {}
+        metadata = {}
+        for column in FILTER_COLUMNS:
+            value = self.vocab[column][self.codes[column][numeric_id]]
+            if value is not None:
+                metadata[column] = value
+        if not np.isnan(self.timestamps[numeric_id]):
+            metadata["timestamp"] = datetime.utcfromtimestamp(self.timestamps[numeric_id]).isoformat()
+        for column in TEXT_COLUMNS:
+            if self.text[column][numeric_id]:
+                metadata[column] = self.text[column][numeric_id]
+        return metadata
+
+    def mask(self, filters: dict, size: int) -> np.ndarray:
+        """
+        Boolean mask over numeric IDs [0, size) matching every filter. Filter
+        columns match by equality; "start"/"end" bound the timestamp.
+        """
+        self._grow(size)
+        mask = np.ones(size, dtype=bool)
+        for column, value in filters.items():
+            if value is None or value == "":
+                continue
+            if column in FILTER_COLUMNS:
+                code = self._lookup[column].get(str(value))
+                if code is None:
+                    return np.zeros(size, dtype=bool)
+                mask &= self.codes[column][:size] == code
+            elif column == "start":
+                mask &= self.timestamps[:size] >= _to_epoch(value)
+            elif column == "end":
+                mask &= self.timestamps[:size] <= _to_epoch(value)
+            else:
+                raise ValueError(f"Cannot filter on '{column}'. Expected one of {FILTER_COLUMNS + ('start', 'end')}.")
+        return mask
+
+    def take(self, numeric_ids: np.ndarray) -> "VectorMetadata":
+        """New store holding the rows `numeric_ids`, renumbered from zero (used by compaction)."""
+        self._grow(int(numeric_ids.max()) + 1 if len(numeric_ids) else 0)
+        taken = VectorMetadata()
+        taken.count = len(numeric_ids)
+        taken.vocab = {column: list(values) for column, values in self.vocab.items()}
+        taken._lookup = {column: dict(values) for column, values in self._lookup.items()}
+        taken.codes = {column: codes[numeric_ids] for column, codes in self.codes.items()}
+        taken.timestamps = self.timestamps[numeric_ids]
+        taken.text = {column: [values[i] for i in numeric_ids] for column, values in self.text.items()}
+        return taken
+
+    def save(self, f):
+        header = {"count": self.count, "vocab": self.vocab, "text": self.text}
+        np.savez(
+            f,
+            header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+            timestamps=self.timestamps[:self.count],
+            **{f"codes_{column}": codes[:self.count] for column, codes in self.codes.items()}
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "VectorMetadata":
+        metadata = cls()
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            metadata.count = header["count"]
+            metadata.timestamps = data["timestamps"].copy()
+            for column in FILTER_COLUMNS:
+                metadata.vocab[column] = header["vocab"].get(column, [None])
+                metadata._lookup[column] = {
+                    value: code for code, value in enumerate(metadata.vocab[column]) if value is not None
+                }
+                key = f"codes_{column}"
+                metadata.codes[column] = data[key].copy() if key in data else np.zeros(metadata.count, dtype=np.int32)
+            for column in TEXT_COLUMNS:
+                metadata.text[column] = header["text"].get(column, [""] * metadata.count)
+        return metadata
+
+    def _encode(self, column: str, value: str) -> int:
+        code = self._lookup[column].get(value)
+        if code is None:
+            code = len(self.vocab[column])
+            self.vocab[column].append(value)
+            self._lookup[column][value] = code
+        return code
+
+    def _grow(self, size: int):
+        if size <= self.count:
+            return
+        if size > len(self.timestamps):
+            capacity = max(size, 2 * len(self.timestamps), 1024)
+            for column in FILTER_COLUMNS:
+                self.codes[column] = np.concatenate(
+                    [self.codes[column], np.zeros(capacity - len(self.codes[column]), dtype=np.int32)]
+                )
+            self.timestamps = np.concatenate(
+                [self.timestamps, np.full(capacity - len(self.timestamps), np.nan)]
+            )
+        for column in TEXT_COLUMNS:
+            self.text[column].extend([""] * (size - self.count))
+        self.count = size
+
+def _to_epoch(value) -> float:
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", ""))
+    except ValueError:
+        return np.nan
+    if parsed.tzinfo is not None:
+        return parsed.timestamp()
+    return (parsed - datetime(1970, 1, 1)).total_seconds()
@@ -1,68 +1,219 @@
 from fastapi import APIRouter, Request
-from sentence_transformers import SentenceTransformer
+import hashlib
 import json
 import os
-import numpy as np
-from web.memory.vector_index import VectorIndex
+import threading
+from web.memory.vector_index import SHARD_DIR
+from web.memory.vector_shards import get_shared_index, DEFAULT_SHARD, LOG_SHARD
+from web.memory.embedding_service import get_embedding_service
+from web.utils.log_store import get_log_store, read_line
 
 router = APIRouter()
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+embedder = get_embedding_service()
 
-# Initialize FAISS-backed VectorIndex after model definition
-index = VectorIndex(dim=model.get_sentence_embedding_dimension())
+# Log lines live in their own shard of the shared index, keyed "<path>:<byte offset>",
+# so IDs stay stable as the files grow and never collide with MemoryManager entries.
+# MemoryManager's default fan-out leaves this shard out (see INTERNAL_SHARDS).
+shards = get_shared_index(embedder.dim)
+index = shards.shard(LOG_SHARD)
 
-# Load logs and their embeddings at startup
-log_file_paths = ['logs/chat_logs.jsonl', 'logs/user_log.jsonl']
-logs = []
+# chat_logs.jsonl is a plain file; user_log is indexed segment by segment (see web.utils.log_store).
+LEGACY_LOG_PATHS = ['logs/chat_logs.jsonl']
+STATE_PATH = os.path.join(SHARD_DIR, LOG_SHARD, "indexed_offsets.json")
+INDEX_BATCH_LINES = 256
+FINGERPRINT_BYTES = 4096
 
-for path in log_file_paths:
-    if os.path.exists(path):
-        with open(path, 'r', encoding='utf-8') as f:
+_indexer = None
+_indexer_lock = threading.Lock()
+_indexed_offsets = {}  # path -> offset, mirrors STATE_PATH
+_scanned_sizes = {}  # path -> file size when an indexing pass last read it
+
+def _entry_text(log_entry):
+    return log_entry.get('text') or log_entry.get('prompt') or json.dumps(log_entry)
+
+def _fingerprint(f, offset):
+    # The first and last FINGERPRINT_BYTES of the indexed prefix: enough to notice a
+    # rotated, truncated or rewritten file without rehashing the whole history.
+    digest = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    f.seek(max(0, offset - FINGERPRINT_BYTES))
+    digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return None
+    with open(STATE_PATH, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    _indexed_offsets.update({path: entry["offset"] for path, entry in state.items()})
+    return state
+
+def _save_state(state):
+    with open(STATE_PATH + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(STATE_PATH + ".tmp", STATE_PATH)
+    _indexed_offsets.update({path: entry["offset"] for path, entry in state.items()})
+
+def _forget_file(path):
+    prefix = f"{path}:"
+    stale = [id_str for id_str in index.id_map if id_str.startswith(prefix)]
+    for id_str in stale:
+        index.remove(id_str)
+    index.save()
+    if stale:
+        print(f"[VectorRetriever] {path} was rotated or rewritten; dropped {len(stale)} stale entries.")
+
+def _drop_positional_ids():
+    # Before offsets were tracked, log lines were stored in the default shard as "0", "1", ...
+    default = shards.shard(DEFAULT_SHARD)
+    i = 0
+    while default.remove(str(i)):
+        i += 1
+    if i:
+        default.save()
+
+def _log_paths():
+    return LEGACY_LOG_PATHS + get_log_store("user_log.jsonl").uncompressed_paths()
+
+def _index_file(path, state):
+    entry = state.get(path, {"offset": 0, "fingerprint": None})
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        _scanned_sizes[path] = size
+        if entry["offset"] and (size < entry["offset"] or _fingerprint(f, entry["offset"]) != entry["fingerprint"]):
+            _forget_file(path)
+            entry = {"offset": 0, "fingerprint": None}
+        offset = entry["offset"]
+        f.seek(offset)
+        indexed = 0
+        while True:
+            ids, texts, metadata = [], [], []
             for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being written; picked up on the next pass
+                line_offset, offset = offset, offset + len(line)
                 try:
-                    log_entry = json.loads(line.strip())
-                    text = log_entry.get('text') or log_entry.get('prompt') or json.dumps(log_entry)
-                    if text:
-                        logs.append({
-                            "text": text,
-                            "source": path,
-                            "timestamp": log_entry.get("timestamp", "unknown")
-                        })
-                except json.JSONDecodeError:
+                    log_entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                text = _entry_text(log_entry) if isinstance(log_entry, dict) else None
+                if not text:
                     continue
+                ids.append(f"{path}:{line_offset}")
+                texts.append(text)
+                metadata.append({"source": path, "timestamp": log_entry.get("timestamp")})
+                if len(ids) >= INDEX_BATCH_LINES:
+                    break
+            if ids:
+                index.add_many(embedder.encode_batch(texts), ids, metadata)
+                index.save()
+                indexed += len(ids)
+            if offset == entry["offset"]:
+                break
+            # Record progress only after the vectors are saved; a crash in between re-adds
+            # the batch on the next boot and the duplicate IDs are skipped.
+            entry = {"offset": offset, "fingerprint": _fingerprint(f, offset)}
+            f.seek(offset)
+            state[path] = entry
+            _save_state(state)
+    return indexed
 
-if logs:
-    for i, entry in enumerate(logs):
-        vector = model.encode(entry["text"], convert_to_numpy=True)
-        index.add(vector, str(i))
-    index.save()
+def index_new_lines():
+    """Embed and index log lines appended since the last run. Returns how many were added."""
+    state = _load_state()
+    if state is None:
+        _drop_positional_ids()
+        state = {}
+    paths = _log_paths()
+    for path in [path for path in state if path not in paths]:
+        # Segments that were compressed keep their entries; files that are gone lose them.
+        if not os.path.exists(path) and not os.path.exists(path + ".gz"):
+            _forget_file(path)
+            del state[path]
+            _indexed_offsets.pop(path, None)
+            _save_state(state)
+    indexed = 0
+    for path in paths:
+        if os.path.exists(path):
+            indexed += _index_file(path, state)
+    if indexed:
+        print(f"[VectorRetriever] Indexed {indexed} new log lines.")
+    return indexed
+
+def _run_indexer():
+    try:
+        index_new_lines()
+    except Exception as e:
+        print(f"[VectorRetriever] Background indexing failed: {e}")
+
+def start_indexing():
+    """Index new log lines on a background thread unless a pass is already running."""
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None or not _indexer.is_alive():
+            _indexer = threading.Thread(target=_run_indexer, name="vector-log-indexer", daemon=True)
+            _indexer.start()
+        return _indexer
+
+def _has_new_lines():
+    # A partial last line keeps the size above the indexed offset, so a file only counts
+    # as changed once it has also grown since the last pass read it.
+    for path in _log_paths():
+        if not os.path.exists(path):
+            continue
+        size = os.path.getsize(path)
+        if size != _indexed_offsets.get(path, 0) and size != _scanned_sizes.get(path):
+            return True
+    return False
+
+start_indexing()
+
+def retrieve_similar_logs(prompt, top_k=5, nprobe=None, ef_search=None):
+    return retrieve_similar_logs_many([prompt], top_k=top_k, nprobe=nprobe, ef_search=ef_search)[0]
 
-def retrieve_similar_logs(prompt, top_k=5):
-    if not logs:
-        return []
+def retrieve_similar_logs_many(prompts, top_k=5, nprobe=None, ef_search=None):
+    if _has_new_lines():
+        start_indexing()
+    if not index.size:
+        return [[] for _ in prompts]
 
-    prompt_embedding = model.encode([prompt], convert_to_numpy=True)[0]
-    results = index.query(prompt_embedding, top_k=top_k)
+    prompt_embeddings = embedder.encode_batch(prompts)
+    return [
+        _format_matches(results)
+        for results in index.query_many(prompt_embeddings, top_k=top_k, nprobe=nprobe, ef_search=ef_search)
+    ]
 
+def _format_matches(results):
     formatted = []
     for id_str, score in results:
-        idx = int(id_str)
-        entry = logs[idx]
+        path, offset = id_str.rsplit(":", 1)
+        try:
+            log_entry = json.loads(read_line(path, int(offset)))
+        except (OSError, ValueError):
+            continue
         formatted.append({
-            "text": entry["text"],
+            "text": _entry_text(log_entry),
             "score": score,
-            "source": entry["source"],
-            "timestamp": entry["timestamp"]
+            "source": path,
+            "timestamp": log_entry.get("timestamp", "unknown")
         })
     return formatted
 
 @router.post("/vector/query")
 async def query_vector_memory(request: Request):
     data = await request.json()
+    prompts = data.get("prompts")
     prompt = data.get("prompt", "")
-    if not prompt:
+    if not prompt and not prompts:
         return {"error": "No prompt provided."}
 
-    results = retrieve_similar_logs(prompt)
-    return {"matches": results}
\ No newline at end of file
+    options = {
+        "top_k": data.get("top_k", 5),
+        "nprobe": data.get("nprobe"),
+        "ef_search": data.get("ef_search")
+    }
+    if prompts:
+        return {"matches": retrieve_similar_logs_many(prompts, **options)}
+    return {"matches": retrieve_similar_logs(prompt, **options)}
@@ -0,0 +1,181 @@
+import heapq
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from web.memory.vector_index import VectorIndex, SHARD_DIR
+
+DEFAULT_SHARD = "default"
+# The log-line index of vector_retriever. Its "<path>:<offset>" entries duplicate what
+# MemoryManager stores, so it is only searched when a caller names it.
+LOG_SHARD = "vector_logs"
+INTERNAL_SHARDS = (LOG_SHARD,)
+MAX_LOADED_SHARDS = int(os.getenv("VECTOR_MAX_LOADED_SHARDS", "64"))
+QUERY_WORKERS = int(os.getenv("VECTOR_QUERY_WORKERS", "4"))
+
+ShardMatch = Tuple[str, float, str]  # (id, score, shard)
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def shard_name(key: str) -> str:
+    """Filesystem-safe shard name for a tenant key such as a session_id or user name."""
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", str(key)).strip(".")
+    return name[:128] or DEFAULT_SHARD
+
+class ShardedVectorIndex:
+    """
+    A set of independently persisted VectorIndex shards, e.g. one per user or
+    session. The "default" shard is the original single index at INDEX_PATH.
+    Shards are opened on first use and the least recently used ones are
+    unloaded beyond MAX_LOADED_SHARDS (checkpointed first if they changed).
+    Queries fan out over the selected shards on a thread pool (FAISS releases
+    the GIL while searching) and the per-shard top-k lists are merged.
+    """
+
+    def __init__(self, dim: int, max_loaded: int = MAX_LOADED_SHARDS, workers: int = QUERY_WORKERS):
+        self.dim = dim
+        self.max_loaded = max_loaded
+        self._shards: "OrderedDict[str, VectorIndex]" = OrderedDict()
+        self._unloading = {}  # evicted shards still being checkpointed, by name
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vector-shard")
+
+    def shard(self, name: str = DEFAULT_SHARD) -> VectorIndex:
+        name = shard_name(name)
+        with self._lock:
+            index = self._shards.get(name)
+            if index is None:
+                # A shard that is still being checkpointed is taken back rather than re-read from disk.
+                index = self._unloading.get(name) or VectorIndex(self.dim, name=None if name == DEFAULT_SHARD else name)
+                self._shards[name] = index
+                evicted = self._evict()
+            else:
+                evicted = []
+            self._shards.move_to_end(name)
+        for evicted_name, evicted_index in evicted:
+            self._persist(evicted_name, evicted_index)
+        return index
+
+    def unload(self, name: str):
+        name = shard_name(name)
+        with self._lock:
+            index = self._shards.pop(name, None)
+            if index is not None:
+                self._unloading[name] = index
+        if index is not None:
+            self._persist(name, index)
+
+    def loaded(self) -> List[str]:
+        return list(self._shards)
+
+    def names(self, include_internal: bool = False) -> List[str]:
+        """Every shard that exists on disk or is currently loaded (INTERNAL_SHARDS only if asked)."""
+        on_disk = os.listdir(SHARD_DIR) if os.path.isdir(SHARD_DIR) else []
+        names = {DEFAULT_SHARD, *on_disk, *self._shards}
+        if not include_internal:
+            names.difference_update(INTERNAL_SHARDS)
+        return sorted(names)
+
+    @property
+    def size(self) -> int:
+        """Live entries across the currently loaded shards."""
+        return sum(index.size for index in list(self._shards.values()))
+
+    def add(self, vector: np.ndarray, id_str: str, shard: str = DEFAULT_SHARD, metadata: Optional[dict] = None):
+        self.shard(shard).add(vector, id_str, metadata)
+
+    def add_many(self, vectors: np.ndarray, id_strs: List[str], shard: str = DEFAULT_SHARD,
+                 metadata: Optional[List[Optional[dict]]] = None) -> int:
+        return self.shard(shard).add_many(vectors, id_strs, metadata)
+
+    def remove(self, id_str: str, shard: str = DEFAULT_SHARD) -> bool:
+        return self.shard(shard).remove(id_str)
+
+    def save(self, shards: Optional[Iterable[str]] = None):
+        for name in shards if shards is not None else self.loaded():
+            self.shard(name).save()
+
+    def query(self, vector: np.ndarray, top_k: int = 5, shards: Optional[Iterable[str]] = None,
+              **search_options) -> List[ShardMatch]:
+        return self.query_many(vector.reshape(1, -1), top_k=top_k, shards=shards, **search_options)[0]
+
+    def query_many(self, vectors: np.ndarray, top_k: int = 5, shards: Optional[Iterable[str]] = None,
+                   **search_options) -> List[List[ShardMatch]]:
+        """
+        Query `shards` in parallel and merge to the global top_k per query row.
+        With shards=None every shard but INTERNAL_SHARDS is searched as long
+        as they all fit in max_loaded; beyond that only the loaded (recently
+        used) ones are, so a default query never cycles every tenant's shard
+        through memory. Pass names() to search them all regardless. Extra
+        keyword arguments go to VectorIndex.query_many.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        existing = self.names(include_internal=True)
+        if shards is None:
+            tenants = self.names()
+            names = tenants if len(tenants) <= self.max_loaded else [
+                name for name in self.loaded() if name not in INTERNAL_SHARDS
+            ]
+        else:
+            # Unknown shards have nothing to search; skip them rather than creating empty ones.
+            names = [name for name in map(shard_name, shards) if name in existing]
+        if not names:
+            return [[] for _ in range(len(vectors))]
+        if len(names) == 1:
+            per_shard = [self._query_shard(names[0], vectors, top_k, search_options)]
+        else:
+            futures = [self._pool.submit(self._query_shard, name, vectors, top_k, search_options) for name in names]
+            per_shard = [future.result() for future in futures]
+        merged = []
+        for row in range(len(vectors)):
+            candidates = (match for shard_results in per_shard for match in shard_results[row])
+            merged.append(heapq.nlargest(top_k, candidates, key=lambda match: match[1]))
+        return merged
+
+    def _query_shard(self, name: str, vectors: np.ndarray, top_k: int, search_options: dict) -> List[List[ShardMatch]]:
+        results = self.shard(name).query_many(vectors, top_k=top_k, **search_options)
+        return [[(id_str, score, name) for id_str, score in row] for row in results]
+
+    def _evict(self) -> List[Tuple[str, VectorIndex]]:
+        # Called with self._lock held; the caller persists the returned shards after releasing it.
+        evicted = []
+        while len(self._shards) > self.max_loaded:
+            name, index = next((item for item in self._shards.items() if item[0] != DEFAULT_SHARD), (None, None))
+            if name is None:
+                break
+            del self._shards[name]
+            self._unloading[name] = index
+            evicted.append((name, index))
+        return evicted
+
+    def _persist(self, name: str, index: VectorIndex):
+        try:
+            # A shard with no changes since its checkpoint is already on disk as it is.
+            if index.dirty:
+                index.save()
+            if index.dirty:
+                index.checkpoint()
+        finally:
+            with self._lock:
+                if self._unloading.get(name) is index:
+                    del self._unloading[name]
+
+def get_shared_index(dim: int) -> ShardedVectorIndex:
+    """
+    The process-wide ShardedVectorIndex for `dim`. Every module that needs the
+    memory index should use this instead of building its own VectorIndex, so a
+    process holds one copy of each shard (and, with VECTOR_MMAP, shares its
+    pages with the other worker processes).
+    """
+    with _shared_lock:
+        index = _shared.get(dim)
+        if index is None:
+            index = ShardedVectorIndex(dim)
+            _shared[dim] = index
+        return index
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Request, Body
 from fastapi.responses import JSONResponse, HTMLResponse
 from web.utils.response import success_response, error_response
 from fastapi.testclient import TestClient
-from web.memory.summarizer_engine import Summarizer
+from web.utils.lazy_loader import get_summarizer
 
 router = APIRouter()
 
@@ -26,7 +26,9 @@ async def agent_auto_fix(request: Request, payload: dict = Body(...)):
 
     try:
         # 1. Summarize the traceback
-        summarizer = Summarizer()
+        summarizer = get_summarizer()
+        if summarizer is None:
+            return error_response("Summarizer is unavailable", status_code=503)
         summary = summarizer.summarize(error_log)
 
         # 2. Try to match existing fix from dev_library
@@ -83,6 +85,7 @@ from datetime import datetime
 from typing import Optional
 import json
 import openai
+from web.utils.logger import log_to_file
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 
@@ -129,10 +132,7 @@ async def run_instruction(request: Request, payload: AgentRequest):
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "ip": request.client.host,
         }
-        log_path = BASE_DIR / "logs" / "agent_log.jsonl"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        log_to_file(log_entry, filename="agent_log.jsonl")
 
         return success_response({"response": result})
     except Exception as e:
@@ -142,10 +142,7 @@ async def run_instruction(request: Request, payload: AgentRequest):
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "ip": request.client.host
         }
-        log_path = BASE_DIR / "logs" / "agent_log.jsonl"
-        log_path.parent.mkdir(parents=True, exist_ok=True)
-        with log_path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(error_log) + "\n")
+        log_to_file(error_log, filename="agent_log.jsonl")
         return error_response(str(e), status_code=500)
 
 # Simple in-memory session context (can replace with persistent store later)
@@ -309,7 +306,7 @@ async def save_to_library(request: Request, session_id: Optional[str] = Form(...
 
 # --- /dev/library/load: semantic search for best library entry ---
 from fastapi import Body
-from sentence_transformers import SentenceTransformer
+from web.memory.embedding_service import get_embedding_service
 import numpy as np
 
 @router.post("/dev/library/load", response_class=JSONResponse)
@@ -318,26 +315,28 @@ async def load_from_library(prompt: dict = Body(...)):
     if not query:
         return JSONResponse(status_code=400, content={"error": "Prompt is required"})
 
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    query_vec = model.encode(query, convert_to_numpy=True)
+    embedder = get_embedding_service()
+    query_vec = embedder.encode(query)
 
     library_dir = BASE_DIR / "dev_library"
-    best_match = None
-    best_score = -1.0
-
+    entries = []
     for path in library_dir.glob("*.json"):
         with path.open("r", encoding="utf-8") as f:
             try:
                 data = json.load(f)
-                context = " ".join(data.get("answers", []))
-                context_vec = model.encode(context, convert_to_numpy=True)
-                score = np.dot(query_vec, context_vec) / (np.linalg.norm(query_vec) * np.linalg.norm(context_vec) + 1e-10)
-                if score > best_score:
-                    best_score = score
-                    best_match = (str(path.name), data)
+                entries.append((str(path.name), data, " ".join(data.get("answers", []))))
             except Exception:
                 continue
 
+    best_match = None
+    best_score = -1.0
+    if entries:
+        context_vecs = embedder.encode_batch([context for _, _, context in entries])
+        scores = context_vecs @ query_vec / (np.linalg.norm(context_vecs, axis=1) * np.linalg.norm(query_vec) + 1e-10)
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        best_match = entries[best][:2]
+
     if best_match:
         return {"file": best_match[0], "score": best_score, "entry": best_match[1]}
     else:
@@ -561,11 +560,9 @@ async def update_build_steps(payload: dict = Body(...)):
     return {"status": "ok", "data": payload}
 # --- Enhanced /agent command route with backend model selection and memory logging ---
 from web.memory.memory_manager import MemoryManager
-from web.memory.summarizer_engine import Summarizer
 from fastapi import Body
 
 memory = MemoryManager()
-summarizer = Summarizer()
 
 @router.post("/agent", response_class=JSONResponse)
 async def agent_command_post(request: Request, payload: dict = Body(...)):
@@ -1,16 +1,16 @@
-import csv
-import json
+import itertools
 import logging
-from io import StringIO
 from pathlib import Path
 
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 
 from web.memory.agents.control_center import ControlCenter
 from web.memory.memory_manager import MemoryManager
-from web.memory.summarizer import Summarizer
+from web.utils.lazy_loader import get_summarizer
+from web.utils.log_store import get_log_store
+from web.utils.streaming_export import csv_lines, export_response, json_array
 from web.utils.response import success_response, error_response
 
 logger = logging.getLogger(__name__)
@@ -23,8 +23,6 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "web" / "templates"))
 control_agent = ControlCenter()
 memory = MemoryManager()
 
-summarizer = Summarizer()
-
 @router.get("/", response_class=HTMLResponse)
 async def control_form(request: Request):
     allowed_extensions = {".md", ".txt"}
@@ -49,9 +47,7 @@ async def run_instruction(request: Request, instruction: str = Form(...)):
 @router.post("/search_memory", response_class=JSONResponse)
 async def search_memory(request: Request, query: str = Form(...), intent: str = Form("")):
     try:
-        matches = memory.search_by_summary(query, top_k=10)
-        if intent:
-            matches = [m for m in matches if m.get("intent", "") == intent.lower()]
+        matches = memory.search_by_summary(query, top_k=10, filters={"intent": intent.lower()})
         return success_response({"results": matches})
     except Exception as e:
         return error_response(str(e), status_code=500)
@@ -59,30 +55,27 @@ async def search_memory(request: Request, query: str = Form(...), intent: str =
 @router.post("/memory/search", response_class=JSONResponse)
 async def vector_memory_search(request: Request, query: str = Form(...), intent: str = Form(""), top_k: int = Form(10)):
     try:
-        matches = memory.search_by_summary(query, top_k=top_k)
-        if intent:
-            matches = [m for m in matches if m.get("intent", "") == intent.lower()]
+        matches = memory.search_by_summary(query, top_k=top_k, filters={"intent": intent.lower()})
         return success_response({"results": matches})
     except Exception as e:
         return error_response(str(e), status_code=500)
 
 @router.get("/export_logs")
-async def export_logs(request: Request, format: str = "json"):
+async def export_logs(request: Request, format: str = "json", gzip: bool = False):
     try:
-        log_path = BASE_DIR / "logs" / "user_log.jsonl"
-        with open(log_path, "r", encoding="utf-8") as f:
-            lines = [json.loads(line) for line in f]
+        entries = get_log_store("user_log.jsonl").iter_entries()
+        first = next(entries, None)
+        if first is None:
+            return error_response("No logs to export", status_code=404)
+        entries = itertools.chain([first], entries)
 
         if format == "csv":
-            output = StringIO()
-            writer = csv.DictWriter(output, fieldnames=lines[0].keys())
-            writer.writeheader()
-            writer.writerows(lines)
-            output.seek(0)
-            return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=logs.csv"})
+            # Columns come from the first entry, as before; keys it lacks are left out of the export.
+            fieldnames = list(first.keys())
+            rows = ([entry.get(field, "") for field in fieldnames] for entry in entries)
+            return export_response(csv_lines(fieldnames, rows), "text/csv", filename="logs.csv", gzip=gzip)
         else:
-            output = json.dumps(lines, indent=2)
-            return StreamingResponse(StringIO(output), media_type="application/json", headers={"Content-Disposition": "attachment; filename=logs.json"})
+            return export_response(json_array(entries, indent=2), "application/json", filename="logs.json", gzip=gzip)
 
     except Exception as e:
         return error_response(str(e), status_code=500)
@@ -90,10 +83,11 @@ async def export_logs(request: Request, format: str = "json"):
 @router.post("/memory/summarize", response_class=JSONResponse)
 async def memory_summarize(request: Request, query: str = Form(...), intent: str = Form("")):
     try:
-        matches = memory.search_by_summary(query, top_k=10)
-        if intent:
-            matches = [m for m in matches if m.get("intent", "") == intent.lower()]
-        combined = "\n".join([m["summary"] for m in matches])
+        matches = memory.search_by_summary(query, top_k=10, filters={"intent": intent.lower()})
+        combined = "\n".join([m.get("summary", "") for m in matches])
+        summarizer = get_summarizer()
+        if summarizer is None:
+            return error_response("Summarizer is unavailable", status_code=503)
         summary = summarizer.summarize(combined)
         return success_response({"results": matches, "summary": summary})
     except Exception as e:
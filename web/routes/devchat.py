@@ -7,7 +7,6 @@ from fastapi.templating import Jinja2Templates
 import asyncio
 import time
 from pathlib import Path
-import json
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 
@@ -17,6 +16,8 @@ from web.memory.vector_retriever import retrieve_similar_logs
 from web.memory.agents.dev_assistant import DevAssistantAgent
 from web.utils.response import success_response, error_response
 from web.utils.logger import log_to_file
+from web.utils.log_store import get_log_store, parse_timestamp
+from web.utils.context_builder import build_context
 
 router = APIRouter()
 
@@ -24,11 +25,11 @@ router = APIRouter()
 async def query_log(prompt: str = Query(..., description="What would you like to know?")):
     agent = DevAssistantAgent()
 
-    similar_logs = retrieve_similar_logs(prompt)
+    similar_logs = retrieve_similar_logs(prompt, top_k=10)
     if not similar_logs:
         return "No similar logs found. Try adding more data."
 
-    context = "\n".join(f"{entry['prompt']} => {entry.get('response', '')}" for entry in similar_logs)
+    context = build_context(similar_logs, model="openai")
     full_prompt = (
         f"You are reviewing past user logs based on a new question: '{prompt}'.\n"
         f"Context from similar logs:\n{context}\n\n"
@@ -88,7 +89,6 @@ async def devchat_query(data: dict = Body(...)):
 @router.post("/devchat/stream")
 async def stream_devchat(data: dict = Body(...)):
     from datetime import datetime
-    import json
 
     prompt = data.get("prompt", "").strip()
     model = data.get("model", "openai")
@@ -136,32 +136,17 @@ async def filter_devchat_logs(
     end_time: str = Query(None),
     contains: str = Query(None)
 ):
-    log_path = BASE_DIR / "logs" / "devchat_log.jsonl"
-    if not log_path.exists():
-        return success_response([])
+    start = parse_timestamp(start_time) if start_time else None
+    end = parse_timestamp(end_time) if end_time else None
+    if (start_time and start is None) or (end_time and end is None):
+        return error_response("start_time and end_time must be ISO-8601 timestamps", status_code=400)
 
     results = []
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                log = json.loads(line)
-                if session_id and log.get("session_id") != session_id:
-                    continue
-                if agent and log.get("agent") != agent:
-                    continue
-                if contains and contains.lower() not in json.dumps(log).lower():
-                    continue
-                if start_time:
-                    log_time = datetime.fromisoformat(log.get("timestamp", "").replace("Z", ""))
-                    if log_time < datetime.fromisoformat(start_time):
-                        continue
-                if end_time:
-                    log_time = datetime.fromisoformat(log.get("timestamp", "").replace("Z", ""))
-                    if log_time > datetime.fromisoformat(end_time):
-                        continue
-                results.append(log)
-            except Exception:
-                continue
+    store = get_log_store("devchat_log.jsonl")
+    for log in store.iter_entries(start=start, end=end, session_id=session_id, contains=contains):
+        if agent and log.get("agent") != agent:
+            continue
+        results.append(log)
 
     return success_response({
         "meta": {"count": len(results)},
@@ -10,6 +10,7 @@ import json
 import time
 import logging
 from web.utils.response import success_response, error_response
+from web.utils.context_builder import build_context
 
 logger = logging.getLogger(__name__)
 
@@ -18,15 +19,19 @@ BASE_DIR = Path(__file__).resolve().parents[2]
 router = APIRouter()
 memory = MemoryManager()
 
+def _document_context(docs, model):
+    snippets = [{"text": f"[{doc['filename']}]\n{doc['content']}", "score": doc.get("score")} for doc in docs]
+    return build_context(snippets, model, separator="\n\n")
+
 @router.get("/docs/query", response_class=PlainTextResponse)
 async def query_documents(prompt: str = Query(..., description="What would you like to ask the documents?")):
-    top_docs = retrieve_similar_documents(prompt, top_k=3)
+    top_docs = retrieve_similar_documents(prompt, top_k=5)
     logger.info("GET /docs/query: Received prompt: %s", prompt)
     if not top_docs:
         logger.warning("No documents found for prompt: %s", prompt)
         return "No processed documents available for query."
 
-    context = "\n\n".join(f"[{doc['filename']}]\n{doc['content']}" for doc in top_docs)
+    context = _document_context(top_docs, "openai")
     full_prompt = f"Answer the question based on the following documents:\n\n{context}\n\nQuestion: {prompt}"
 
     agent = DevAssistantAgent()
@@ -39,13 +44,13 @@ class DocQuery(BaseModel):
 @router.post("/docquery", response_class=JSONResponse)
 async def query_documents_json(data: DocQuery):
     model = data.model if data.model in ["openai", "gemini"] else "openai"
-    top_docs = retrieve_similar_documents(data.query, top_k=3)
+    top_docs = retrieve_similar_documents(data.query, top_k=5)
 
     if not top_docs:
         logger.warning("POST /docquery: No top documents found for query: %s", data.query)
         return error_response("No documents found.", status_code=404)
 
-    context = "\n\n".join(f"[{doc['filename']}]\n{doc['content']}" for doc in top_docs)
+    context = _document_context(top_docs, model)
     full_prompt = f"Answer the question based on the following documents:\n\n{context}\n\nQuestion: {data.query}"
 
     agent = DevAssistantAgent()
@@ -72,9 +77,9 @@ async def query_documents_json(data: DocQuery):
 async def fake_stream_docquery(data: DocQuery) -> StreamingResponse:
     # NOTE: This is a simulated stream. To support real streaming, replace with an async generator tied to an LLM stream API.
     model = data.model if data.model in ["openai", "gemini"] else "openai"
-    top_docs = retrieve_similar_documents(data.query, top_k=3)
+    top_docs = retrieve_similar_documents(data.query, top_k=5)
 
-    context = "\n\n".join(f"[{doc['filename']}]\n{doc['content']}" for doc in top_docs) if top_docs else "No relevant documents found."
+    context = _document_context(top_docs, model) if top_docs else "No relevant documents found."
     full_prompt = f"Answer the question based on the following documents:\n\n{context}\n\nQuestion: {data.query}"
     
     agent = DevAssistantAgent()
@@ -7,10 +7,12 @@ import io
 import logging
 
 from web.utils.response import success_response, error_response
+from web.utils.log_store import get_log_store
+from web.utils.streaming_export import csv_lines, export_response, json_array
 
 logger = logging.getLogger(__name__)
 
-LOG_PATH = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
+LOG_NAME = "user_log.jsonl"
 
 router = APIRouter()
 
@@ -23,77 +25,73 @@ async def export_logs(request: Request):
         logger.warning("Invalid folder path: %s", folder_path)
         return error_response("Invalid folder path", status_code=400)
 
-    if not LOG_PATH.exists():
-        logger.warning("Source log file not found: %s", LOG_PATH)
+    store = get_log_store(LOG_NAME)
+    if not store.segments():
+        logger.warning("Source log not found: %s", store.dir)
         return error_response("Source log file not found", status_code=404)
 
     destination = folder_path / "exported_user_log.jsonl"
-    shutil.copy2(LOG_PATH, destination)
+    with destination.open("wb") as dest:
+        for record in store.segments():
+            with store.open_segment(record, binary=True) as src:
+                shutil.copyfileobj(src, dest)
     logger.info("Logs exported to: %s", destination)
 
     return success_response({"status": "exported", "destination": str(destination)})
 
-from fastapi.responses import StreamingResponse
-import csv
-import json
+def _csv_rows(entries):
+    for entry in entries:
+        try:
+            yield [
+                entry.get("timestamp", ""),
+                entry.get("user", {}).get("name", ""),
+                entry.get("text", ""),
+                entry.get("status", "")
+            ]
+        except Exception:
+            continue
 
 @router.get("/export/logs.csv")
-async def export_logs_csv():
-    if not LOG_PATH.exists():
-        logger.warning("Source log file not found: %s", LOG_PATH)
+async def export_logs_csv(gzip: bool = False):
+    store = get_log_store(LOG_NAME)
+    if not store.segments():
+        logger.warning("Source log not found: %s", store.dir)
         return error_response("Source log file not found", status_code=404)
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["timestamp", "user", "text", "status"])
-
-    with LOG_PATH.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                writer.writerow([
-                    entry.get("timestamp", ""),
-                    entry.get("user", {}).get("name", ""),
-                    entry.get("text", ""),
-                    entry.get("status", "")
-                ])
-            except Exception:
-                continue
-
-    output.seek(0)
-    logger.info("CSV export completed with %d entries", output.tell())
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=user_log.csv"})
+    logger.info("Streaming CSV export of %s", store.dir)
+    rows = _csv_rows(store.iter_entries())
+    return export_response(csv_lines(["timestamp", "user", "text", "status"], rows), "text/csv",
+                           filename="user_log.csv", gzip=gzip)
 
 @router.get("/export/logs.json")
-async def export_logs_json():
-    if not LOG_PATH.exists():
-        logger.warning("Source log file not found: %s", LOG_PATH)
+async def export_logs_json(gzip: bool = False):
+    store = get_log_store(LOG_NAME)
+    if not store.segments():
+        logger.warning("Source log not found: %s", store.dir)
         return error_response("Source log file not found", status_code=404)
 
-    with LOG_PATH.open("r", encoding="utf-8") as f:
-        entries = [json.loads(line) for line in f if line.strip()]
-    logger.info("Exported %d JSON log entries", len(entries))
-
-    return success_response(entries)
+    logger.info("Streaming JSON export of %s", store.dir)
+    # Same envelope as success_response, written one entry at a time.
+    body = json_array(store.iter_entries(), prefix='{"status": "success", "data": [', suffix="]}")
+    return export_response(body, "application/json", filename="user_log.json" if gzip else None, gzip=gzip)
 
 @router.get("/export/logs.pdf")
 async def export_logs_pdf():
-    if not LOG_PATH.exists():
-        logger.warning("Source log file not found: %s", LOG_PATH)
+    store = get_log_store(LOG_NAME)
+    if not store.segments():
+        logger.warning("Source log not found: %s", store.dir)
         return JSONResponse(status_code=404, content={"error": "Source log file not found"})
 
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=12)
 
-    with LOG_PATH.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                text = f"{entry.get('timestamp', '')} | {entry.get('user', {}).get('name', '')} | {entry.get('text', '')}\n"
-                pdf.multi_cell(0, 10, text)
-            except Exception:
-                continue
+    for entry in store.iter_entries():
+        try:
+            text = f"{entry.get('timestamp', '')} | {entry.get('user', {}).get('name', '')} | {entry.get('text', '')}\n"
+            pdf.multi_cell(0, 10, text)
+        except Exception:
+            continue
 
     output = io.BytesIO()
     pdf.output(output)
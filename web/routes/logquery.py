@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from web.memory.loggerquery import get_recent_logs
-from web.memory.summarizer_engine import Summarizer
-from web.memory.memory_manager import MemoryManager
+from web.utils.lazy_loader import get_summarizer
+from web.utils.log_store import get_log_store
 from dateutil.parser import parse as parse_date
 import json
+from datetime import timezone
 from web.utils.response import error_response
 
 router = APIRouter()
 
+def _epoch(dt):
+    # Naive bounds are UTC, like the log timestamps.
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
 @router.get("/log/query", response_class=StreamingResponse)
 async def summarize_logs(
     request: Request,
@@ -21,27 +26,25 @@ async def summarize_logs(
     end: str = None,
     keyword: str = None
 ):
-    memory = MemoryManager()
-    summarizer = Summarizer()
+    summarizer = get_summarizer()
     try:
-        entries = get_recent_logs(limit * 3)
+        start_ts = _epoch(parse_date(start)) if start else None
+        end_ts = _epoch(parse_date(end)) if end else None
+        if start_ts is not None or end_ts is not None:
+            # Read backward through the time index's blocks, stopping after limit * 3 matches.
+            entries = get_log_store("user_log.jsonl").tail(limit * 3, contains=keyword, start=start_ts, end=end_ts)
+        else:
+            entries = get_recent_logs(limit * 3, contains=keyword)["logs"]
         if ip:
             entries = [e for e in entries if e.get("data", {}).get("ip") == ip or e.get("ip") == ip]
         if event:
             entries = [e for e in entries if e.get("event") == event]
-        if start:
-            dt_start = parse_date(start)
-            entries = [e for e in entries if "timestamp" in e and parse_date(e["timestamp"]) >= dt_start]
-        if end:
-            dt_end = parse_date(end)
-            entries = [e for e in entries if "timestamp" in e and parse_date(e["timestamp"]) <= dt_end]
-        if keyword:
-            keyword_lower = keyword.lower()
-            entries = [e for e in entries if keyword_lower in json.dumps(e).lower()]
         entries = entries[-limit:]
     except ValueError as e:
         return StreamingResponse((line for line in [f"error: {str(e)}"]), media_type="text/plain")
 
-    prompt = memory.build_context_from_logs(entries)
+    prompt = "\n".join(e.get("text") or json.dumps(e) for e in entries)
+    if summarizer is None:
+        return error_response("Summarizer is unavailable", status_code=503)
     summary = summarizer.summarize(prompt)
     return StreamingResponse((line for line in [summary]), media_type="text/plain")
@@ -1,10 +1,12 @@
 from fastapi import APIRouter
-from pathlib import Path
-import json
 import os
 from web.memory.plan_executor import store_plan
 from web.utils.response import success_response, error_response
 from web.memory.embedding_store import get_store_summary
+from web.memory.embedding_service import embedding_stats
+from web.memory.ingest_queue import get_ingest_queue
+from web.utils.lazy_loader import registry
+from web.utils.log_store import get_log_store
 from web.memory.loggerquery import get_recent_logs
 
 router = APIRouter(prefix="/memory", tags=["Memory Admin"])
@@ -14,15 +16,8 @@ async def memory_status():
     return success_response({"status": "Memory admin endpoint active"})
 
 @router.get("/logs")
-async def get_memory_logs():
-    log_file = Path("logs/user_log.jsonl")
-    if not log_file.exists():
-        return success_response({"logs": []})
-    
-    with open(log_file, "r") as f:
-        lines = f.readlines()
-    
-    return success_response({"logs": [json.loads(line) for line in lines[-50:]]})
+async def get_memory_logs(limit: int = 50, skip: int = 0):
+    return success_response({"logs": get_log_store("user_log.jsonl").tail(limit, skip=skip)})
 
 @router.delete("/plans/clear")
 async def clear_plans():
@@ -34,8 +29,12 @@ async def system_health():
     return success_response({
         "status": "ok",
         "env": os.environ.get("ENV", "dev"),
-        "memory_log_exists": Path("logs/user_log.jsonl").exists(),
-        "embedding_store": get_store_summary()
+        "memory_log_exists": get_log_store("user_log.jsonl").stats()["entries"] > 0,
+        "user_log": get_log_store("user_log.jsonl").stats(),
+        "embedding_store": get_store_summary(),
+        "embeddings": embedding_stats(),
+        "ingest": get_ingest_queue().stats(),
+        "models": registry.stats()
     })
 
 @router.get("/logs/recent")
@@ -44,17 +43,7 @@ async def get_recent_memory_logs(
     skip: int = 0,
     contains: str = None
 ):
-    logs_data = get_recent_logs(limit=limit + skip)
-    filtered_logs = []
-
-    if contains:
-        for entry in logs_data["logs"]:
-            if contains.lower() in json.dumps(entry).lower():
-                filtered_logs.append(entry)
-    else:
-        filtered_logs = logs_data["logs"]
-
-    paginated_logs = filtered_logs[skip:skip + limit]
+    paginated_logs = get_recent_logs(limit=limit, skip=skip, contains=contains)["logs"]
 
     return success_response({
         "count": len(paginated_logs),
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from web.utils.response import success_response, error_response
 from pydantic import BaseModel
-from web.memory.summarizer_engine import Summarizer
+from web.utils.lazy_loader import get_summarizer
 
 router = APIRouter()
 
@@ -12,9 +12,11 @@ class ReflectionRequest(BaseModel):
 @router.post("/reflect")
 async def reflect_on_chat(data: ReflectionRequest, request: Request):
     try:
-        summarizer = Summarizer()
+        summarizer = get_summarizer()
+        if summarizer is None:
+            return error_response("Summarizer is unavailable", status_code=503)
         chat_text = "\n".join(data.chat_history)
-        insight = summarizer.summarize_text(chat_text)
+        insight = summarizer.summarize(chat_text)
         return success_response({"reflection": insight})
     except Exception as e:
         return error_response(str(e), status_code=500)
\ No newline at end of file
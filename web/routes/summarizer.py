@@ -1,11 +1,10 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from web.memory.summarizer_engine import Summarizer
+from web.utils.lazy_loader import get_summarizer
 from web.memory.memory_manager import MemoryManager
 from web.utils.response import success_response, error_response
 
 router = APIRouter()
-summarizer = Summarizer()
 memory = MemoryManager()
 
 class SummaryRequest(BaseModel):
@@ -21,6 +20,10 @@ async def summarize_text(request: SummaryRequest):
     if len(request.text.split()) < 5:
         return success_response({"summary": "[Text too short to summarize]"})
 
+    summarizer = get_summarizer()
+    if summarizer is None:
+        return error_response("Summarizer is unavailable", status_code=503)
+
     summary = summarizer.summarize(
         text=request.text,
         max_length=request.max_length,
@@ -1,28 +1,29 @@
 from fastapi import APIRouter, Form, Request, Query
 from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from web.utils.response import success_response, error_response
+from web.utils.context_builder import build_context, count_tokens
 router = APIRouter()
-import tiktoken
 from starlette.responses import Response
 from pathlib import Path
 import json
 from datetime import datetime
+from web.utils.log_store import get_log_store
+from web.utils.streaming_export import csv_lines, export_response, json_array
 
-def get_session_context(session_id, top_k=5):
-    path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
-    if not path.exists():
-        return []
-    lines = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                obj = json.loads(line)
-                if obj.get("session_id") == session_id and "text" in obj:
-                    lines.append(obj["text"])
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
-    return lines[-top_k:]
+# Most recent session turns considered for context; build_context keeps what fits the model's budget.
+SESSION_CONTEXT_TURNS = 20
+USER_LOG = "user_log.jsonl"
+
+def get_session_context(session_id, top_k=SESSION_CONTEXT_TURNS):
+    # Reads only the session's last entries, via the log's session index.
+    entries = get_log_store(USER_LOG).tail(top_k, session_id=session_id)
+    return [{"text": entry["text"], "timestamp": entry.get("timestamp")} for entry in entries if "text" in entry]
+
+def _session_entries(session_id, keyword=None):
+    # Seeks straight to the session's entries (narrowed by the keyword's terms) through the log's indexes.
+    for entry in get_log_store(USER_LOG).iter_entries(session_id=session_id, contains=keyword):
+        if "text" in entry and (keyword is None or keyword.lower() in entry["text"].lower()):
+            yield entry
 
 
 # Stream response dynamically from selected model/service with context injection
@@ -37,12 +38,9 @@ async def stream_response(
     token_counter = {"count": 0}
     full_prompt = prompt
 
-    encoding = tiktoken.encoding_for_model(model)
-
     if use_memory_flag:
-        past_logs = get_session_context(session_id, top_k=5)
-        if past_logs:
-            context = "\n".join(past_logs)
+        context = build_context(get_session_context(session_id), model)
+        if context:
             full_prompt = f"{context}\n\n{prompt}"
 
     async def stream_openai():
@@ -57,7 +55,7 @@ async def stream_response(
                     delta = chunk["choices"][0].get("delta", {})
                     if "content" in delta:
                         text = delta["content"]
-                        token_counter["count"] += len(encoding.encode(text))
+                        token_counter["count"] += count_tokens(text, model)
                         yield text
         except Exception as e:
             yield f"\n[ERROR] {str(e)}"
@@ -65,7 +63,7 @@ async def stream_response(
     async def stream_gemini():
         try:
             for chunk in stream_gemini_response(full_prompt):
-                token_counter["count"] += len(encoding.encode(chunk))
+                token_counter["count"] += count_tokens(chunk, model)
                 yield chunk
         except Exception as e:
             yield f"\n[ERROR] {str(e)}"
@@ -98,99 +96,44 @@ async def capture_feedback(request: Request):
 
 @router.get("/history/search")
 async def search_history(session_id: str = Query(...), keyword: str = Query(None)):
-    log_path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
-    if not log_path.exists():
+    if not get_log_store(USER_LOG).segments():
         return error_response("Log file not found", status_code=404)
 
-    results = []
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                if entry.get("session_id") == session_id and "text" in entry:
-                    if keyword is None or keyword.lower() in entry["text"].lower():
-                        results.append(entry)
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
+    results = list(_session_entries(session_id, keyword))
 
     return success_response({"logs": results})
 
-import csv
-import io
-
 @router.get("/history/export.csv")
-async def export_history_csv(session_id: str = Query(...), keyword: str = Query(None)):
-    log_path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
-    if not log_path.exists():
+async def export_history_csv(session_id: str = Query(...), keyword: str = Query(None), gzip: bool = Query(False)):
+    if not get_log_store(USER_LOG).segments():
         return error_response("Log file not found", status_code=404)
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["timestamp", "session_id", "text"])
-
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                if entry.get("session_id") == session_id and "text" in entry:
-                    if keyword is None or keyword.lower() in entry["text"].lower():
-                        writer.writerow([entry.get("timestamp", ""), entry["session_id"], entry["text"]])
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
-
-    output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={
-        "Content-Disposition": "attachment; filename=history_export.csv"
-    })
+    rows = (
+        [entry.get("timestamp", ""), entry["session_id"], entry["text"]]
+        for entry in _session_entries(session_id, keyword)
+    )
+    return export_response(csv_lines(["timestamp", "session_id", "text"], rows), "text/csv",
+                           filename="history_export.csv", gzip=gzip)
 
 
 # --- Export history as JSON and PDF ---
 from fpdf import FPDF
 
 @router.get("/history/export.json")
-async def export_history_json(session_id: str = Query(...), keyword: str = Query(None)):
-    log_path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
-    if not log_path.exists():
+async def export_history_json(session_id: str = Query(...), keyword: str = Query(None), gzip: bool = Query(False)):
+    if not get_log_store(USER_LOG).segments():
         return error_response("Log file not found", status_code=404)
 
-    filtered = []
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                if entry.get("session_id") == session_id and "text" in entry:
-                    if keyword is None or keyword.lower() in entry["text"].lower():
-                        filtered.append(entry)
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
-
-    json_path = Path(__file__).resolve().parents[2] / "logs" / "history_export.json"
-    with json_path.open("w", encoding="utf-8") as f:
-        json.dump(filtered, f, indent=2)
-
-    return FileResponse(path=json_path, media_type="application/json", filename="session_history.json")
+    body = json_array(_session_entries(session_id, keyword), indent=2)
+    return export_response(body, "application/json", filename="session_history.json", gzip=gzip)
 
 
 @router.get("/history/export.pdf")
 async def export_history_pdf(session_id: str = Query(...), keyword: str = Query(None)):
-    log_path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
-    if not log_path.exists():
+    if not get_log_store(USER_LOG).segments():
         return error_response("Log file not found", status_code=404)
 
-    filtered = []
-    with log_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                if entry.get("session_id") == session_id and "text" in entry:
-                    if keyword is None or keyword.lower() in entry["text"].lower():
-                        filtered.append(entry)
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
+    filtered = list(_session_entries(session_id, keyword))
 
     pdf_path = Path(__file__).resolve().parents[2] / "logs" / "history_export.pdf"
     pdf = FPDF()
@@ -206,28 +149,20 @@ async def export_history_pdf(session_id: str = Query(...), keyword: str = Query(
 
 @router.get("/history/archive")
 async def archive_history(session_id: str = Query(...), keyword: str = Query(None)):
-    log_path = Path(__file__).resolve().parents[2] / "logs" / "user_log.jsonl"
     archive_dir = Path(__file__).resolve().parents[2] / "logs" / "archives"
     archive_dir.mkdir(parents=True, exist_ok=True)
 
-    if not log_path.exists():
+    if not get_log_store(USER_LOG).segments():
         return error_response("Log file not found", status_code=404)
 
     timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
     archive_file = archive_dir / f"{session_id}_{timestamp}.jsonl"
 
     filtered = []
-    with log_path.open("r", encoding="utf-8") as src, archive_file.open("w", encoding="utf-8") as dest:
-        for line in src:
-            try:
-                entry = json.loads(line.strip())
-                if entry.get("session_id") == session_id and "text" in entry:
-                    if keyword is None or keyword.lower() in entry["text"].lower():
-                        dest.write(json.dumps(entry) + "\n")
-                        filtered.append(entry)
-            except Exception as e:
-                print(f"Log read error: {e}")
-                continue
+    with archive_file.open("w", encoding="utf-8") as dest:
+        for entry in _session_entries(session_id, keyword):
+            dest.write(json.dumps(entry) + "\n")
+            filtered.append(entry)
 
     print(f"Archived {len(filtered)} entries to {archive_file}")
 
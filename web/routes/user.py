@@ -48,7 +48,7 @@ def create_user(user: User):
 
     memory.store_log_entry(log_entry)
 
-    similar_logs = memory.retrieve_similar(prompt_text, top_k=3)
+    similar_logs = memory.retrieve_similar(prompt_text, top_k=3, shards=[memory.shard_for(log_entry)])
     print("[MEMORY] Top 3 similar logs:")
     for log in similar_logs:
         print(log)
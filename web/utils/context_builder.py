@@ -0,0 +1,141 @@
+import math
+import os
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+# Token budget for retrieved context, per model name prefix (longest prefix wins).
+# CONTEXT_BUDGETS="gpt-4o=12000,gemini=8000" overrides or adds entries, and
+# CONTEXT_TOKEN_BUDGET applies to models that match none of them.
+DEFAULT_BUDGETS = {
+    "gpt-4o": 8000,
+    "gpt-4-32k": 8000,
+    "gpt-4": 3000,
+    "gpt-3.5-turbo": 3000,
+    "gemini": 8000,
+    "openai": 3000,
+}
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_BUDGETS = {
+    **DEFAULT_BUDGETS,
+    **{
+        name.strip(): int(tokens)
+        for name, _, tokens in (item.partition("=") for item in os.getenv("CONTEXT_BUDGETS", "").split(","))
+        if name.strip() and tokens.strip()
+    },
+}
+# Ranking is CONTEXT_RELEVANCE_WEIGHT * relevance + the rest * recency, where
+# recency halves every CONTEXT_RECENCY_HALF_LIFE_HOURS.
+CONTEXT_RELEVANCE_WEIGHT = float(os.getenv("CONTEXT_RELEVANCE_WEIGHT", "0.8"))
+CONTEXT_RECENCY_HALF_LIFE_HOURS = float(os.getenv("CONTEXT_RECENCY_HALF_LIFE_HOURS", "72"))
+# Snippets whose word-trigram Jaccard similarity to a better-ranked one reaches this are dropped.
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.85"))
+# A snippet that does not fit is truncated only if at least this many tokens are left.
+CONTEXT_MIN_SNIPPET_TOKENS = int(os.getenv("CONTEXT_MIN_SNIPPET_TOKENS", "32"))
+
+FALLBACK_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=32)
+def get_encoder(model: str):
+    """The tiktoken encoding for `model`, resolved once per model name; None without tiktoken."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+def count_tokens(text: str, model: str) -> int:
+    encoder = get_encoder(model)
+    if encoder is None:
+        return math.ceil(len(text) / 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+def token_budget(model: str) -> int:
+    matches = [name for name in CONTEXT_BUDGETS if model.startswith(name)]
+    return CONTEXT_BUDGETS[max(matches, key=len)] if matches else CONTEXT_TOKEN_BUDGET
+
+def _truncate(text: str, tokens: int, model: str) -> str:
+    encoder = get_encoder(model)
+    if encoder is None:
+        return text[:tokens * 4]
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:tokens])
+
+def _age_hours(timestamp, now: datetime) -> Optional[float]:
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return max(0.0, (now - parsed).total_seconds() / 3600)
+
+def _shingles(text: str) -> frozenset:
+    # Digits are folded so snippets differing only in ids or timestamps count as duplicates.
+    words = re.sub(r"\d+", "0", text.lower()).split()
+    if len(words) < 3:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + 3]) for i in range(len(words) - 2))
+
+def _rank(snippets: List[dict]) -> List[float]:
+    scores = [snippet.get("score") for snippet in snippets]
+    known = [score for score in scores if isinstance(score, (int, float))]
+    low, high = (min(known), max(known)) if known else (0.0, 0.0)
+    now = datetime.now(timezone.utc)
+    ranks = []
+    for position, (snippet, score) in enumerate(zip(snippets, scores)):
+        age = _age_hours(snippet.get("timestamp"), now)
+        recency = 0.5 ** (age / CONTEXT_RECENCY_HALF_LIFE_HOURS) if age is not None else 0.0
+        if isinstance(score, (int, float)):
+            relevance = (score - low) / (high - low) if high > low else 1.0
+        elif age is not None:
+            # Unscored snippets with a timestamp (e.g. session turns) rank purely by recency, newest first.
+            relevance = recency
+        else:
+            # Otherwise the caller's order (best first) stands in for relevance.
+            relevance = 1.0 - position / len(snippets)
+        ranks.append(CONTEXT_RELEVANCE_WEIGHT * relevance + (1 - CONTEXT_RELEVANCE_WEIGHT) * recency)
+    return ranks
+
+def select_snippets(snippets: List[dict], model: str, budget: Optional[int] = None,
+                    separator: str = "\n") -> List[dict]:
+    """
+    The best of `snippets` (dicts with "text" and optional "score" and ISO
+    "timestamp") that fit in `budget` tokens, in their original order. Snippets
+    are taken by relevance and recency, near-duplicates of an already chosen
+    snippet are skipped, and the last one that does not fit is truncated if
+    enough room is left.
+    """
+    budget = token_budget(model) if budget is None else budget
+    candidates = [snippet for snippet in snippets if (snippet.get("text") or "").strip()]
+    if not candidates or budget <= 0:
+        return []
+    ranks = _rank(candidates)
+    order = sorted(range(len(candidates)), key=lambda i: ranks[i], reverse=True)
+    separator_tokens = count_tokens(separator, model) if separator else 0
+
+    chosen, kept_shingles, remaining = {}, [], budget
+    for i in order:
+        text = candidates[i]["text"].strip()
+        shingles = _shingles(text)
+        if any(len(shingles & kept) / len(shingles | kept) >= CONTEXT_DEDUPE_THRESHOLD for kept in kept_shingles):
+            continue
+        cost = count_tokens(text, model) + (separator_tokens if chosen else 0)
+        if cost > remaining:
+            room = remaining - (separator_tokens if chosen else 0)
+            if room >= CONTEXT_MIN_SNIPPET_TOKENS:
+                chosen[i] = {**candidates[i], "text": _truncate(text, room, model)}
+                break
+            continue
+        chosen[i] = {**candidates[i], "text": text}
+        kept_shingles.append(shingles)
+        remaining -= cost
+    return [chosen[i] for i in sorted(chosen)]
+
+def build_context(snippets: List[dict], model: str, budget: Optional[int] = None, separator: str = "\n") -> str:
+    return separator.join(snippet["text"] for snippet in select_snippets(snippets, model, budget, separator))
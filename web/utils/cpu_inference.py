@@ -0,0 +1,29 @@
+import contextlib
+import logging
+import os
+
+# Opt-in CPU inference path: int8 dynamic quantization of every nn.Linear
+# (weights stored as int8, activations quantized per call), torch.inference_mode
+# around forward passes, and MODEL_TORCH_THREADS intra-op threads (0 keeps
+# torch's default of one per physical core).
+CPU_OPTIMIZE = os.getenv("MODEL_CPU_OPTIMIZE", "false").lower() == "true"
+TORCH_THREADS = int(os.getenv("MODEL_TORCH_THREADS", "0"))
+
+def configure_threads(threads: int = TORCH_THREADS):
+    if threads <= 0:
+        return
+    import torch
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+        logging.info(f"[cpu_inference] Using {threads} torch threads")
+
+def quantize_linear(module):
+    """An int8 dynamically quantized copy of `module`; only nn.Linear layers change."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+def inference_context(enabled: bool = CPU_OPTIMIZE):
+    if not enabled:
+        return contextlib.nullcontext()
+    import torch
+    return torch.inference_mode()
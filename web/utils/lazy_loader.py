@@ -1,9 +1,196 @@
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Loaded models beyond MODEL_MEMORY_BUDGET_MB (0 = no limit) are unloaded least
+# recently used first; MODEL_IDLE_SECONDS (0 = never) also unloads any model that
+# has not been used for that long. Names in MODEL_WARMUP are loaded in the
+# background as soon as this module is imported.
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "0"))
+MODEL_WARMUP = [name.strip() for name in os.getenv("MODEL_WARMUP", "").split(",") if name.strip()]
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+class _Entry:
+    def __init__(self, factory: Callable, warmup: Optional[Callable]):
+        self.factory = factory
+        self.warmup = warmup
+        self.model = None
+        self.size_mb = 0.0
+        self.last_used = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """
+    Process-wide models, each loaded once on first get(). Callers should fetch
+    the model from the registry on every use rather than keep a reference, so
+    that unloading actually frees its memory.
+    """
+
+    def __init__(self, budget_mb: float = MODEL_MEMORY_BUDGET_MB, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.budget_mb = budget_mb
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def register(self, name: str, factory: Callable, warmup: Optional[Callable] = None):
+        """`warmup(model)` runs once after each load, e.g. a dummy inference to fill caches."""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(factory, warmup)
+
+    def get(self, name: str):
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No model registered as '{name}'.")
+        with entry.lock:
+            if entry.model is None:
+                start = time.time()
+                model = entry.factory()
+                if entry.warmup is not None:
+                    entry.warmup(model)
+                entry.model = model
+                entry.size_mb = _size_mb(model)
+                entry.loads += 1
+                entry.load_seconds += time.time() - start
+                logging.info(f"[lazy_loader] Loaded '{name}' ({entry.size_mb:.0f} MB) in {time.time() - start:.1f}s")
+            else:
+                entry.hits += 1
+            entry.last_used = time.time()
+            model = entry.model
+        with self._lock:
+            self._entries.move_to_end(name)
+        self._enforce_budget(keep=name)
+        self._start_sweeper()
+        return model
+
+    def unload(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        with entry.lock:
+            if entry.model is None:
+                return False
+            entry.model = None
+            entry.evictions += 1
+        logging.info(f"[lazy_loader] Unloaded '{name}'")
+        return True
+
+    def warmup(self, names=None, background: bool = True):
+        names = list(names) if names is not None else list(self._entries)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logging.warning(f"[lazy_loader] Warmup of '{name}' failed: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.time()
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "size_mb": round(entry.size_mb, 1),
+                "idle_seconds": round(now - entry.last_used, 1) if entry.last_used else None,
+                "loads": entry.loads,
+                "hits": entry.hits,
+                "evictions": entry.evictions,
+                "load_seconds": round(entry.load_seconds, 2),
+            }
+            for name, entry in list(self._entries.items())
+        }
+
+    def _enforce_budget(self, keep: str):
+        if self.budget_mb <= 0:
+            return
+        with self._lock:
+            loaded = [(name, entry) for name, entry in self._entries.items() if entry.model is not None]
+        total = sum(entry.size_mb for _, entry in loaded)
+        for name, entry in loaded:  # least recently used first
+            if total <= self.budget_mb:
+                break
+            if name != keep and self.unload(name):
+                total -= entry.size_mb
+
+    def _start_sweeper(self):
+        if self.idle_seconds <= 0 or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep, name="model-idle-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(max(1.0, self.idle_seconds / 4))
+            now = time.time()
+            for name, entry in list(self._entries.items()):
+                if entry.model is not None and now - entry.last_used >= self.idle_seconds:
+                    self.unload(name)
+
+def _size_mb(model) -> float:
+    # Parameter memory of the torch module inside a pipeline, SentenceTransformer or wrapper.
+    for candidate in (model, getattr(model, "model", None), getattr(model, "summarizer", None),
+                      getattr(getattr(model, "summarizer", None), "model", None)):
+        parameters = getattr(candidate, "parameters", None)
+        if callable(parameters):
+            try:
+                return sum(p.numel() * p.element_size() for p in parameters()) / (1024 * 1024)
+            except Exception:
+                return 0.0
+    return 0.0
+
+registry = ModelRegistry()
+
+def _load_summarizer():
+    from web.memory.summarizer_engine import Summarizer
+    return Summarizer()
+
+registry.register("summarizer", _load_summarizer, warmup=lambda summarizer: summarizer.summarize("warm up " * 40))
+
+def register_embedding_model(model_name: str = EMBEDDING_MODEL) -> str:
+    """Register a SentenceTransformer and return its registry name ("embedding" for the default model)."""
+    name = "embedding" if model_name == EMBEDDING_MODEL else f"embedding:{model_name}"
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+        from web.utils.cpu_inference import CPU_OPTIMIZE, configure_threads, quantize_linear
+        model = SentenceTransformer(model_name, device="cpu")
+        if CPU_OPTIMIZE:
+            configure_threads()
+            model = quantize_linear(model)
+        return model
+
+    registry.register(name, load, warmup=lambda model: model.encode(["warm up"]))
+    return name
+
+register_embedding_model()
 
 def get_summarizer():
     try:
-        from web.memory.summarizer_engine import Summarizer
-        return Summarizer()
+        return registry.get("summarizer")
     except Exception as e:
         logging.warning(f"[lazy_loader] Failed to load Summarizer: {e}")
         return None
+
+def get_model(name: str):
+    return registry.get(name)
+
+if MODEL_WARMUP:
+    registry.warmup(MODEL_WARMUP)
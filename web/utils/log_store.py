@@ -0,0 +1,784 @@
+import base64
+import bisect
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialized
+    fcntl = None
+
+LOG_DIR = Path(__file__).resolve().parents[2] / "logs"
+
+# Each log (user_log.jsonl, devchat_log.jsonl, ...) is a directory of numbered
+# JSONL segments plus manifest.json. The active segment is sealed once it holds
+# LOG_SEGMENT_MAX_BYTES or its first entry is LOG_SEGMENT_MAX_HOURS old; sealed
+# segments whose newest entry is LOG_COMPRESS_AFTER_HOURS old are gzipped
+# (0 = never).
+LOG_SEGMENT_MAX_BYTES = int(os.getenv("LOG_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024)))
+LOG_SEGMENT_MAX_HOURS = float(os.getenv("LOG_SEGMENT_MAX_HOURS", "24"))
+LOG_COMPRESS_AFTER_HOURS = float(os.getenv("LOG_COMPRESS_AFTER_HOURS", "168"))
+# A segment with more distinct sessions than this records none and is never skipped by session.
+LOG_MANIFEST_MAX_SESSIONS = int(os.getenv("LOG_MANIFEST_MAX_SESSIONS", "1000"))
+# Read size when tailing a segment backward from its end.
+TAIL_BLOCK_BYTES = int(os.getenv("LOG_TAIL_BLOCK_BYTES", "65536"))
+# Entries per checkpoint of the sparse timestamp index.
+LOG_TIME_INDEX_INTERVAL = int(os.getenv("LOG_TIME_INDEX_INTERVAL", "64"))
+# Sealed segments whose lookup indexes are kept in memory, least recently used out first.
+LOG_INDEX_CACHE_SEGMENTS = int(os.getenv("LOG_INDEX_CACHE_SEGMENTS", "64"))
+
+MANIFEST = "manifest.json"
+# session_id -> [first, last] sealed segment id holding it, so session reads skip the rest.
+SESSION_SPANS = "sessions.json"
+WRITER_LOCK = "append.lock"
+TOKEN = re.compile(r"\w+")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def parse_timestamp(value) -> Optional[float]:
+    """Epoch seconds for an ISO-8601 timestamp ("Z" or naive means UTC); None if unparseable."""
+    if not isinstance(value, str):
+        return None
+    return _parse_timestamp(value)
+
+@lru_cache(maxsize=65536)
+def _parse_timestamp(value: str) -> Optional[float]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _new_record(segment_id: int) -> dict:
+    return {
+        "id": segment_id,
+        "file": f"{segment_id:06d}.jsonl",
+        "count": 0,
+        "bytes": 0,
+        "min_time": None,
+        "max_time": None,
+        "sessions": [],
+        "opened_at": time.time(),
+        "sealed": False,
+        "compressed": False,
+    }
+
+def _track(record: dict, entry, size: int):
+    record["bytes"] += size
+    if not isinstance(entry, dict):
+        return
+    record["count"] += 1
+    ts = parse_timestamp(entry.get("timestamp"))
+    if ts is not None:
+        record["min_time"] = ts if record["min_time"] is None else min(record["min_time"], ts)
+        record["max_time"] = ts if record["max_time"] is None else max(record["max_time"], ts)
+    session_id = entry.get("session_id")
+    sessions = record["sessions"]
+    if session_id is not None and sessions is not None and session_id not in sessions:
+        sessions.append(session_id)
+        if len(sessions) > LOG_MANIFEST_MAX_SESSIONS:
+            record["sessions"] = None
+
+def _parse(line) -> Optional[dict]:
+    try:
+        entry = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return entry if isinstance(entry, dict) else None
+
+def _strings(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+def _contains(entry: dict, needle: str) -> bool:
+    """Whether lowercase `needle` occurs in the serialized entry or in any of its strings."""
+    return needle in json.dumps(entry).lower() or any(needle in text.lower() for text in _strings(entry))
+
+def entry_terms(entry: dict) -> set:
+    # Terms of the serialized entry (what "in json.dumps(entry)" filters see) and of its raw strings.
+    terms = set(TOKEN.findall(json.dumps(entry).lower()))
+    for text in _strings(entry):
+        terms.update(TOKEN.findall(text.lower()))
+    return terms
+
+def encode_postings(offsets: List[int]) -> bytes:
+    """Ascending offsets as LEB128 varints of the gaps between them."""
+    out, previous = bytearray(), 0
+    for offset in offsets:
+        delta, previous = offset - previous, offset
+        while delta >= 0x80:
+            out.append(delta & 0x7F | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+def decode_postings(data: bytes) -> List[int]:
+    offsets, value, shift, previous = [], 0, 0, 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        offsets.append(previous)
+        value = shift = 0
+    return offsets
+
+def _overlaps(record: dict, start: Optional[float], end: Optional[float]) -> bool:
+    if start is None and end is None:
+        return True
+    if record["min_time"] is None:
+        return False  # no entry in it has a timestamp to match
+    return not ((start is not None and record["max_time"] < start) or (end is not None and record["min_time"] > end))
+
+class SegmentIndex:
+    """
+    A per-segment lookup structure. The active segment's is updated on every
+    append; a sealed segment's is saved beside it as <id>.<kind>.json, or
+    built from the segment on first use if it predates the index.
+    """
+    kind = ""
+
+    def empty(self):
+        raise NotImplementedError
+
+    def add(self, state, entry: dict, offset: int):
+        raise NotImplementedError
+
+    def dump(self, state):
+        return state
+
+    def load(self, data):
+        return data
+
+class SessionIndex(SegmentIndex):
+    """session_id -> byte offsets of that session's entries."""
+    kind = "sessions"
+
+    def empty(self):
+        return {}
+
+    def add(self, state, entry: dict, offset: int):
+        session_id = entry.get("session_id")
+        if session_id is not None:
+            state.setdefault(str(session_id), []).append(offset)
+
+class TermIndex(SegmentIndex):
+    """
+    Inverted index: term -> offsets of the entries containing it. Sealed
+    segments keep each postings list as delta-varint bytes (base64 on disk).
+    """
+    kind = "terms"
+
+    def empty(self):
+        return {}
+
+    def add(self, state, entry: dict, offset: int):
+        for term in entry_terms(entry):
+            state.setdefault(term, []).append(offset)
+
+    def dump(self, state):
+        return {
+            term: base64.b64encode(postings if isinstance(postings, bytes) else encode_postings(postings)).decode("ascii")
+            for term, postings in state.items()
+        }
+
+    def load(self, data):
+        return {term: base64.b64decode(postings) for term, postings in data.items()}
+
+    def postings(self, state, term: str) -> List[int]:
+        postings = state.get(term, [])
+        return decode_postings(postings) if isinstance(postings, bytes) else postings
+
+    def lookup(self, state, query: str) -> Optional[List[int]]:
+        """
+        Offsets of entries that may contain `query` as a substring (a superset;
+        callers check the text). None when the query has no terms to look up.
+        """
+        query = query.lower()
+        tokens = list(TOKEN.finditer(query))
+        if not tokens:
+            return None
+        result = None
+        for i, match in enumerate(tokens):
+            token = match.group()
+            # The first and last tokens may be the end or start of a longer word.
+            open_start = i == 0 and match.start() == 0
+            open_end = i == len(tokens) - 1 and match.end() == len(query)
+            if open_start and open_end:
+                terms = [term for term in state if token in term]
+            elif open_start:
+                terms = [term for term in state if term.endswith(token)]
+            elif open_end:
+                terms = [term for term in state if term.startswith(token)]
+            else:
+                terms = [token] if token in state else []
+            offsets = set()
+            for term in terms:
+                offsets.update(self.postings(state, term))
+            result = offsets if result is None else result & offsets
+            if not result:
+                return []
+        return sorted(result)
+
+class TimeIndex(SegmentIndex):
+    """
+    Sparse timestamp index: one checkpoint per LOG_TIME_INDEX_INTERVAL entries
+    with the block's start offset, its min/max timestamp (whole epoch seconds,
+    rounded outward) and the running max up to it. Entries are appended in
+    roughly time order, so a range query bisects on the running max to find
+    its first block and stops once no later block can start before the end.
+    """
+    kind = "time"
+
+    def empty(self):
+        return {"offsets": [], "counts": [], "mins": [], "maxs": [], "running_max": []}
+
+    def add(self, state, entry: dict, offset: int):
+        if not state["counts"] or state["counts"][-1] >= LOG_TIME_INDEX_INTERVAL:
+            state["offsets"].append(offset)
+            state["counts"].append(0)
+            state["mins"].append(None)
+            state["maxs"].append(None)
+            state["running_max"].append(state["running_max"][-1] if state["running_max"] else None)
+        state["counts"][-1] += 1
+        ts = parse_timestamp(entry.get("timestamp"))
+        if ts is None:
+            return
+        low, high = math.floor(ts), math.ceil(ts)
+        state["mins"][-1] = low if state["mins"][-1] is None else min(state["mins"][-1], low)
+        state["maxs"][-1] = high if state["maxs"][-1] is None else max(state["maxs"][-1], high)
+        running = state["running_max"][-1]
+        state["running_max"][-1] = high if running is None else max(running, high)
+
+    def ranges(self, state, start: Optional[float], end: Optional[float]) -> List[tuple]:
+        """(from, to) byte ranges of the blocks that may hold entries in start..end; to=None is EOF."""
+        result = []
+        for block in self.blocks(state, start, end):
+            if result and result[-1][1] == block[0]:
+                result[-1] = (result[-1][0], block[1])  # merge adjacent blocks into one read
+            else:
+                result.append(block)
+        return result
+
+    def blocks(self, state, start: Optional[float], end: Optional[float]) -> List[tuple]:
+        """Like ranges(), but one (from, to) per block, so they can also be read last to first."""
+        offsets, mins, maxs = state["offsets"], state["mins"], state["maxs"]
+        running = [-math.inf if value is None else value for value in state["running_max"]]
+        first = bisect.bisect_left(running, start) if start is not None else 0
+        # Smallest timestamp in each block and everything after it.
+        suffix_min, lowest = [math.inf] * len(offsets), math.inf
+        for i in range(len(offsets) - 1, first - 1, -1):
+            if mins[i] is not None:
+                lowest = min(lowest, mins[i])
+            suffix_min[i] = lowest
+        result = []
+        for i in range(first, len(offsets)):
+            if end is not None and suffix_min[i] > end:
+                break
+            if mins[i] is None or (start is not None and maxs[i] < start) or (end is not None and mins[i] > end):
+                continue
+            result.append((offsets[i], offsets[i + 1] if i + 1 < len(offsets) else None))
+        return result
+
+class LogStore:
+    """
+    Append-only JSONL log split into time- and size-bounded segments. The
+    manifest records each segment's entry count, time range and sessions, so
+    readers only open the segments that can hold what they ask for.
+    """
+
+    def __init__(self, name: str, log_dir: Path = LOG_DIR):
+        self.name = name
+        self.dir = Path(log_dir) / Path(name).stem
+        self.legacy_path = Path(log_dir) / name
+        self._lock = threading.RLock()
+        self._records: List[dict] = []
+        self._manifest_mtime = None
+        self._compressing = False
+        self._indexes = {index.kind: index for index in (SessionIndex(), TermIndex(), TimeIndex())}
+        self._active_state = {}
+        self._session_spans = {}
+        self._index_cache: "OrderedDict[tuple, object]" = OrderedDict()
+        with self._lock:
+            self._adopt_legacy_file()
+            self._load()
+
+    # --- writing ---
+
+    def append(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self._lock, self._writer_lock():
+            self._refresh()
+            active = self._active()
+            if self._should_seal(active):
+                self._seal(active)
+                active = self._active()
+            with (self.dir / active["file"]).open("a+b") as f:
+                # Entries another process appended since the last refresh.
+                self._scan(active, active["bytes"], index=True)
+                offset = f.seek(0, os.SEEK_END)
+                if offset > active["bytes"]:
+                    # A line cut short by a crash; end it so this entry starts on its own line.
+                    f.write(b"\n")
+                    _track(active, None, offset + 1 - active["bytes"])
+                    offset += 1
+                f.write(line.encode("utf-8"))
+                end = f.tell()
+            _track(active, entry, end - offset)
+            active["bytes"] = end
+            self._index_entry(entry, offset)
+
+    @contextmanager
+    def _writer_lock(self):
+        # Serializes appends and seals with other writer processes.
+        with (self.dir / WRITER_LOCK).open("a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _should_seal(self, active: dict) -> bool:
+        if not active["count"]:
+            return False
+        if active["bytes"] >= LOG_SEGMENT_MAX_BYTES:
+            return True
+        return LOG_SEGMENT_MAX_HOURS > 0 and time.time() - active["opened_at"] >= LOG_SEGMENT_MAX_HOURS * 3600
+
+    def _seal(self, active: dict):
+        for kind, index in self._indexes.items():
+            self._save_index(kind, active["id"], self._active_state[kind])
+        for session_id in self._active_state["sessions"]:
+            self._session_spans.setdefault(session_id, [active["id"], active["id"]])[1] = active["id"]
+        # Written before the manifest, whose change is what makes other processes reload both.
+        self._save_session_spans()
+        self._active_state = {kind: index.empty() for kind, index in self._indexes.items()}
+        active["sealed"] = True
+        self._records.append(_new_record(active["id"] + 1))
+        self._save_manifest()
+        logging.info(f"[LogStore] Sealed {self.name} segment {active['file']} ({active['count']} entries)")
+        if LOG_COMPRESS_AFTER_HOURS > 0 and not self._compressing:
+            self._compressing = True
+            threading.Thread(target=self.compress_old_segments, name="log-compress", daemon=True).start()
+
+    def compress_old_segments(self, older_than_hours: float = LOG_COMPRESS_AFTER_HOURS) -> int:
+        """Gzip sealed segments whose newest entry is older than `older_than_hours`. Returns how many."""
+        try:
+            cutoff = time.time() - older_than_hours * 3600
+            with self._lock:
+                candidates = [
+                    record for record in self._records
+                    if record["sealed"] and not record["compressed"]
+                    and (record["max_time"] if record["max_time"] is not None else record["opened_at"]) < cutoff
+                ]
+            compressed = 0
+            for record in candidates:
+                plain = self.dir / record["file"]
+                packed = self.dir / (record["file"] + ".gz")
+                # Unique per compressor, since another process may be packing the same segment.
+                tmp = f"{packed}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with plain.open("rb") as src, gzip.open(tmp, "wb") as dest:
+                        shutil.copyfileobj(src, dest)
+                except FileNotFoundError:
+                    continue  # already compressed by another process
+                os.replace(tmp, packed)
+                # Under the writer lock, so the manifest saved here cannot drop a segment
+                # another process sealed in the meantime.
+                with self._lock, self._writer_lock():
+                    self._refresh()
+                    for current in self._records:
+                        if current["id"] == record["id"]:
+                            current["compressed"] = True
+                    self._save_manifest()
+                plain.unlink(missing_ok=True)
+                compressed += 1
+            if compressed:
+                logging.info(f"[LogStore] Compressed {compressed} {self.name} segments")
+            return compressed
+        finally:
+            self._compressing = False
+
+    # --- reading ---
+
+    def segments(self, start: Optional[float] = None, end: Optional[float] = None,
+                 session_id: Optional[str] = None) -> List[dict]:
+        """Manifest records (oldest first) of the segments that may hold matching entries."""
+        with self._lock:
+            self._refresh()
+            records = self._records
+            if session_id is not None:
+                # Only the segments between the session's first and last sealed one, plus the active one.
+                first, last = self._session_spans.get(str(session_id), (None, None))
+                records = [
+                    record for record in records
+                    if not record["sealed"] or (first is not None and first <= record["id"] <= last)
+                ]
+            return [
+                dict(record) for record in records
+                if record["count"] and _overlaps(record, start, end)
+                and (session_id is None or record["sessions"] is None or session_id in record["sessions"])
+            ]
+
+    def segment_path(self, record: dict) -> Path:
+        return self.dir / (record["file"] + ".gz" if record["compressed"] else record["file"])
+
+    def open_segment(self, record: dict, binary: bool = False):
+        if not record["compressed"] and not (self.dir / record["file"]).exists():
+            record = {**record, "compressed": True}  # compressed since the manifest was read
+        path = self.segment_path(record)
+        opener = gzip.open if record["compressed"] else open
+        return opener(path, "rb") if binary else opener(path, "rt", encoding="utf-8")
+
+    def iter_entries(self, start: Optional[float] = None, end: Optional[float] = None,
+                     session_id: Optional[str] = None, contains: Optional[str] = None) -> Iterator[dict]:
+        """
+        Entries in write order, restricted to `start`..`end` (epoch seconds, by
+        their "timestamp"), `session_id` and entries containing the substring
+        `contains` (case-insensitive) when given. Unparseable lines are skipped.
+        """
+        for record in self.segments(start, end, session_id):
+            offsets = self._candidates(record, session_id, contains)
+            if offsets is not None:
+                lines = self._read_at(record, offsets)
+            elif start is not None or end is not None:
+                lines = self._read_ranges(record, self._indexes["time"].ranges(self.index_state("time", record), start, end))
+            else:
+                lines = self._read_all(record)
+            for line in lines:
+                entry = _parse(line)
+                if entry is None or not _matches(entry, session_id, contains) or not _in_range(entry, start, end):
+                    continue
+                yield entry
+
+    def tail(self, limit: int, skip: int = 0, session_id: Optional[str] = None,
+             contains: Optional[str] = None, start: Optional[float] = None,
+             end: Optional[float] = None) -> List[dict]:
+        """
+        The `limit` matching entries before the newest `skip` matches, oldest
+        first. Without filters, segments are skipped whole by their manifest
+        counts and read backward from the end; with filters, only the entries the
+        session and term indexes point at (or the time index's blocks for
+        `start`..`end`) are read, newest first. Either way the cost follows
+        skip + limit rather than the size of the log.
+        """
+        entries = []
+        if limit <= 0:
+            return entries
+        timed = start is not None or end is not None
+        filtered = session_id is not None or bool(contains) or timed
+        for record in reversed(self.segments(start, end, session_id)):
+            if not filtered and skip >= record["count"]:
+                skip -= record["count"]
+                continue
+            offsets = self._candidates(record, session_id, contains)
+            blocks = None
+            if offsets is None and timed:
+                blocks = self._indexes["time"].blocks(self.index_state("time", record), start, end)
+            for entry in self._reversed_entries(record, offsets, lambda: limit - len(entries) + skip, blocks):
+                if not _matches(entry, session_id, contains) or not _in_range(entry, start, end):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                entries.append(entry)
+                if len(entries) >= limit:
+                    return entries[::-1]
+        return entries[::-1]
+
+    def _candidates(self, record: dict, session_id: Optional[str], contains: Optional[str]) -> Optional[List[int]]:
+        """Ascending offsets of the entries in `record` that may match, or None to read them all."""
+        offsets = None
+        if session_id is not None:
+            offsets = self.index_state("sessions", record).get(str(session_id), [])
+        if contains:
+            matches = self._indexes["terms"].lookup(self.index_state("terms", record), contains)
+            if matches is not None:
+                offsets = matches if offsets is None else sorted(set(offsets) & set(matches))
+        return offsets
+
+    def _reversed_entries(self, record: dict, offsets: Optional[List[int]], batch,
+                          blocks: Optional[List[tuple]] = None) -> Iterator[dict]:
+        if offsets is None and blocks is not None:
+            # Time index blocks, last to first; gzip cannot seek backward cheaply, so a
+            # compressed segment reads its blocks forward once.
+            groups = [list(self._read_ranges(record, blocks))] if record["compressed"] else (
+                list(self._read_ranges(record, [block])) for block in reversed(blocks)
+            )
+            for lines in groups:
+                for line in reversed(lines):
+                    entry = _parse(line)
+                    if entry is not None:
+                        yield entry
+            return
+        if offsets is None:
+            with self.open_segment(record, binary=True) as f:
+                lines = reverse_lines(f) if not record["compressed"] else reversed(f.readlines())
+                for line in lines:
+                    entry = _parse(line)
+                    if entry is not None:
+                        yield entry
+            return
+        # Read the offsets back to front in batches sized to what the caller still needs.
+        end = len(offsets)
+        while end > 0:
+            start = max(0, end - max(1, batch()))
+            for line in reversed(list(self._read_at(record, offsets[start:end]))):
+                entry = _parse(line)
+                if entry is not None:
+                    yield entry
+            end = start
+
+    def index_state(self, kind: str, record: dict):
+        """The `kind` index of a segment: live for the active one, loaded or built for sealed ones."""
+        with self._lock:
+            if not record["sealed"] and record["id"] == self._active()["id"]:
+                return self._active_state[kind]
+            key = (kind, record["id"])
+            if key in self._index_cache:
+                self._index_cache.move_to_end(key)
+                return self._index_cache[key]
+        index = self._indexes[kind]
+        path = self.dir / f"{record['id']:06d}.{kind}.json"
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                state = index.load(json.load(f))
+        else:
+            state = index.empty()
+            for offset, line in self._read_all(record, with_offsets=True):
+                entry = _parse(line)
+                if entry is not None:
+                    index.add(state, entry, offset)
+            state = self._save_index(kind, record["id"], state)
+        with self._lock:
+            self._cache_index(key, state)
+        return state
+
+    def _index_entry(self, entry: dict, offset: int):
+        if isinstance(entry, dict):
+            for kind, index in self._indexes.items():
+                index.add(self._active_state[kind], entry, offset)
+
+    def _save_index(self, kind: str, segment_id: int, state):
+        """Write a sealed segment's index and cache it in its compact loaded form, which is returned."""
+        index = self._indexes[kind]
+        data = index.dump(state)
+        path = self.dir / f"{segment_id:06d}.{kind}.json"
+        with open(str(path) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(str(path) + ".tmp", path)
+        state = index.load(data)
+        self._cache_index((kind, segment_id), state)
+        return state
+
+    def _cache_index(self, key: tuple, state):
+        self._index_cache[key] = state
+        self._index_cache.move_to_end(key)
+        while len(self._index_cache) > LOG_INDEX_CACHE_SEGMENTS:
+            self._index_cache.popitem(last=False)
+
+    def _read_at(self, record: dict, offsets: List[int]) -> Iterator[bytes]:
+        # Offsets are ascending, so a compressed segment is only ever read forward.
+        with self.open_segment(record, binary=True) as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield f.readline()
+
+    def _read_ranges(self, record: dict, ranges: List[tuple]) -> Iterator[bytes]:
+        with self.open_segment(record, binary=True) as f:
+            for start, end in ranges:
+                f.seek(start)
+                position = start
+                for line in f:
+                    yield line
+                    position += len(line)
+                    if end is not None and position >= end:
+                        break
+
+    def _read_all(self, record: dict, with_offsets: bool = False) -> Iterator:
+        with self.open_segment(record, binary=True) as f:
+            offset = 0
+            for line in f:
+                if with_offsets:
+                    yield offset, line
+                else:
+                    yield line
+                offset += len(line)
+
+    def uncompressed_paths(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return [str(self.dir / record["file"]) for record in self._records if not record["compressed"]]
+
+    def stats(self) -> dict:
+        records = self.segments()
+        return {
+            "segments": len(records),
+            "entries": sum(record["count"] for record in records),
+            "bytes": sum(record["bytes"] for record in records),
+            "compressed_segments": sum(record["compressed"] for record in records),
+        }
+
+    # --- manifest ---
+
+    def _active(self) -> dict:
+        return self._records[-1]
+
+    def _adopt_legacy_file(self):
+        # A log written before segmenting becomes the first sealed segment, history intact.
+        if self.dir.exists() or not self.legacy_path.is_file():
+            return
+        self.dir.mkdir(parents=True)
+        record = _new_record(0)
+        os.replace(self.legacy_path, self.dir / record["file"])
+        self._scan(record, 0)
+        record["sealed"] = True
+        self._records = [record, _new_record(1)]
+        self._save_manifest()
+        logging.info(f"[LogStore] Moved {self.legacy_path} into {self.dir} ({record['count']} entries)")
+
+    def _load(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.dir / MANIFEST
+        if manifest.exists():
+            with manifest.open("r", encoding="utf-8") as f:
+                self._records = json.load(f)["segments"]
+            self._manifest_mtime = manifest.stat().st_mtime
+        if not self._records:
+            self._records = [_new_record(0)]
+        active = self._active()
+        if active["sealed"]:
+            self._records.append(_new_record(active["id"] + 1))
+        self._load_session_spans()
+        # The active segment is not in the manifest until sealed; rebuild its stats and indexes from the file.
+        self._active_state = {kind: index.empty() for kind, index in self._indexes.items()}
+        active = self._active()
+        if (self.dir / active["file"]).exists():
+            stored = _new_record(active["id"])
+            self._scan(stored, 0, index=True)
+            stored["opened_at"] = stored["min_time"] or (self.dir / active["file"]).stat().st_mtime
+            self._records[-1] = stored
+
+    def _refresh(self):
+        # Pick up segments sealed and lines appended by other processes.
+        manifest = self.dir / MANIFEST
+        mtime = manifest.stat().st_mtime if manifest.exists() else None
+        if mtime != self._manifest_mtime:
+            self._records = []
+            self._load()
+            return
+        active = self._active()
+        path = self.dir / active["file"]
+        if path.exists() and path.stat().st_size > active["bytes"]:
+            self._scan(active, active["bytes"], index=True)
+
+    def _scan(self, record: dict, offset: int, index: bool = False):
+        with (self.dir / record["file"]).open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    entry = None
+                _track(record, entry, len(line))
+                if index:
+                    self._index_entry(entry, offset)
+                offset += len(line)
+
+    def _load_session_spans(self):
+        path = self.dir / SESSION_SPANS
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                self._session_spans = json.load(f)
+            return
+        # Logs sealed before spans were kept: build them once from the segments' session indexes.
+        self._session_spans = {}
+        sealed = [record for record in self._records if record["sealed"]]
+        for record in sealed:
+            for session_id in self.index_state("sessions", record):
+                self._session_spans.setdefault(session_id, [record["id"], record["id"]])[1] = record["id"]
+        if sealed:
+            self._save_session_spans()
+
+    def _save_session_spans(self):
+        path = self.dir / SESSION_SPANS
+        with open(str(path) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._session_spans, f)
+        os.replace(str(path) + ".tmp", path)
+
+    def _save_manifest(self):
+        manifest = self.dir / MANIFEST
+        tmp = self.dir / (MANIFEST + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"segments": [record for record in self._records if record["sealed"]]}, f)
+        os.replace(tmp, manifest)
+        self._manifest_mtime = manifest.stat().st_mtime
+
+def _in_range(entry: dict, start: Optional[float], end: Optional[float]) -> bool:
+    if start is None and end is None:
+        return True
+    ts = parse_timestamp(entry.get("timestamp"))
+    return ts is not None and (start is None or ts >= start) and (end is None or ts <= end)
+
+def _matches(entry: dict, session_id: Optional[str], contains: Optional[str]) -> bool:
+    if session_id is not None and entry.get("session_id") != session_id:
+        return False
+    return not contains or _contains(entry, contains.lower())
+
+def reverse_lines(f, block_size: int = TAIL_BLOCK_BYTES) -> Iterator[bytes]:
+    """Non-empty lines of the binary file `f`, last to first, read backward in blocks from EOF."""
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    partial = b""
+    while position > 0:
+        step = min(block_size, position)
+        position -= step
+        f.seek(position)
+        lines = (f.read(step) + partial).split(b"\n")
+        partial = lines.pop(0)  # may continue in the previous block
+        for line in reversed(lines):
+            if line:
+                yield line
+    if partial:
+        yield partial
+
+def read_line(path: str, offset: int) -> bytes:
+    """The line at byte `offset` of a segment file, read from its .gz if it has been compressed since."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.readline()
+    with gzip.open(path + ".gz", "rb") as f:
+        f.seek(offset)
+        return f.readline()
+
+def get_log_store(name: str) -> LogStore:
+    """The process-wide LogStore for `name` (e.g. "user_log.jsonl")."""
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = LogStore(name)
+        return _stores[name]
@@ -1,15 +1,8 @@
-
-
-
-import json
-from pathlib import Path
+from web.utils.log_store import get_log_store
 
 def log_to_file(entry: dict, filename: str = "devchat_log.jsonl"):
     """
-    Appends a JSON log entry to a file in the /logs directory.
-    Creates the file and parent folder if they don't exist.
+    Appends a JSON log entry to the segmented log `filename` under /logs
+    (see web.utils.log_store). Creates the log if it doesn't exist.
     """
-    path = Path(__file__).resolve().parents[2] / "logs" / filename
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(entry) + "\n")
\ No newline at end of file
+    get_log_store(filename).append(entry)
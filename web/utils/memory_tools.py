@@ -0,0 +1,4 @@
+from web.utils.log_store import get_log_store
+
+def get_recent_logs(log_name="user_log.jsonl", limit=50, skip=0):
+    return get_log_store(log_name).tail(limit, skip=skip)
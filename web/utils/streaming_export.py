@@ -0,0 +1,65 @@
+import csv
+import io
+import itertools
+import json
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+# Serialized records are sent in chunks of about this many bytes.
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+
+def csv_lines(header: list, rows: Iterable[list]) -> Iterator[str]:
+    """The header and each row as CSV text, one line at a time."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in itertools.chain([header], rows):
+        writer.writerow(row)
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+def json_array(items: Iterable, prefix: str = "[", suffix: str = "]", indent: Optional[int] = None) -> Iterator[str]:
+    """A JSON array of `items` (optionally wrapped in prefix/suffix), one element at a time."""
+    newline = "\n" if indent else ""
+    yield prefix
+    for i, item in enumerate(items):
+        yield ("," if i else "") + newline + json.dumps(item, indent=indent)
+    yield newline + suffix
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    # Sync-flushed per chunk so compressed bytes go out as soon as each chunk is ready.
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(pieces: Iterable[str], media_type: str, filename: Optional[str] = None,
+                    gzip: bool = False) -> StreamingResponse:
+    """
+    Stream `pieces` (lazily produced text) in EXPORT_CHUNK_BYTES chunks, so an
+    export runs in constant memory and starts sending at once. With gzip=True
+    the body is compressed on the fly and served as <filename>.gz.
+    """
+    body = _chunked(pieces)
+    if gzip:
+        body = gzipped(body)
+        media_type = "application/gzip"
+        filename = (filename or "export") + ".gz"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"} if filename else None
+    return StreamingResponse(body, media_type=media_type, headers=headers)